@@ -0,0 +1,153 @@
+"""
+As-you-type tag suggestions.
+
+Tag names are kept in memory in a sorted list. All the names starting with a
+prefix sit next to each other, so one ``bisect`` finds them without touching
+the database. Each process loads the index on first use (the ASGI entry
+point warms it at startup). Signals apply this process's tag changes right
+away. Changes made by other processes are picked up by a background reload
+once the index is ``BLOG_TAG_AUTOCOMPLETE_MAX_AGE`` seconds old.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from taggit.models import Tag
+
+
+def get_max_age():
+    return getattr(settings, "BLOG_TAG_AUTOCOMPLETE_MAX_AGE", 300)
+
+
+def get_limit():
+    return getattr(settings, "BLOG_TAG_AUTOCOMPLETE_LIMIT", 10)
+
+
+class PrefixIndex:
+    """Sorted ``(lowercased name, id, name)`` entries answering prefix queries by bisection."""
+
+    def __init__(self, entries):
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._entries = sorted((name.lower(), pk, name) for pk, name in entries)
+        self._keys = {pk: (key, pk, name) for key, pk, name in self._entries}
+
+    @property
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    def add(self, pk, name):
+        with self._lock:
+            self._discard(pk)
+            entry = (name.lower(), pk, name)
+            bisect.insort(self._entries, entry)
+            self._keys[pk] = entry
+
+    def remove(self, pk):
+        with self._lock:
+            self._discard(pk)
+
+    def _discard(self, pk):
+        entry = self._keys.pop(pk, None)
+        if entry is not None:
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def complete(self, prefix, limit):
+        """Return up to ``limit`` names starting with ``prefix``, ignoring case."""
+        prefix = prefix.lower()
+        names = []
+        with self._lock:
+            position = bisect.bisect_left(self._entries, (prefix,))
+            for key, pk, name in self._entries[position:position + limit]:
+                if not key.startswith(prefix):
+                    break
+                names.append(name)
+        return names
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def load_index():
+    """Build a ``PrefixIndex`` of every tag name."""
+    return PrefixIndex(Tag.objects.order_by().values_list("pk", "name").iterator(chunk_size=10000))
+
+
+_index = None
+_index_lock = threading.Lock()
+_load_lock = threading.Lock()
+# Changes recorded while a reload is running, replayed onto the new index
+_pending = None
+_reloading = False
+
+
+def _apply(index, pk, name):
+    if name is None:
+        index.remove(pk)
+    else:
+        index.add(pk, name)
+
+
+def _reload():
+    global _index, _pending, _reloading
+    with _index_lock:
+        _pending = []
+    try:
+        index = load_index()
+        with _index_lock:
+            for pk, name in _pending:
+                _apply(index, pk, name)
+            _index = index
+    finally:
+        with _index_lock:
+            _pending = None
+            _reloading = False
+
+
+def _reload_in_background():
+    try:
+        _reload()
+    finally:
+        close_old_connections()
+
+
+def get_index():
+    """
+    Return this process's tag index, loading it on first use.
+
+    An index older than ``BLOG_TAG_AUTOCOMPLETE_MAX_AGE`` is still returned,
+    but a reload is started in a background thread.
+    """
+    global _reloading
+    with _index_lock:
+        index = _index
+        if index is not None:
+            if index.age > get_max_age() and not _reloading:
+                _reloading = True
+                threading.Thread(target=_reload_in_background, name="tag-autocomplete-reload", daemon=True).start()
+            return index
+    with _load_lock:
+        if _index is None:
+            _reload()
+    return _index
+
+
+def record_tag_change(pk, name):
+    """Apply a committed tag name to the loaded index, if any; ``None`` drops the tag."""
+    with _index_lock:
+        if _pending is not None:
+            _pending.append((pk, name))
+        index = _index
+    if index is not None:
+        _apply(index, pk, name)
+
+
+def reset_index():
+    """Drop the loaded index; the next ``get_index()`` reloads it."""
+    global _index
+    with _index_lock:
+        _index = None
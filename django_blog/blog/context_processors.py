@@ -0,0 +1,6 @@
+from . import tagstats
+
+
+def tag_cloud(request):
+    """Expose the most used tags as ``tag_cloud``; they are only read when a template uses them."""
+    return {"tag_cloud": tagstats.top_tags}
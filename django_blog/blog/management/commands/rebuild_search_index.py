@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.search import index_posts
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the blog search index from every post"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Number of posts indexed per transaction")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_pk = 0
+        indexed = 0
+        while True:
+            chunk = list(Post.objects.filter(pk__gt=last_pk).order_by("pk")[:chunk_size])
+            if not chunk:
+                break
+            index_posts(chunk)
+            indexed += len(chunk)
+            last_pk = chunk[-1].pk
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} posts."))
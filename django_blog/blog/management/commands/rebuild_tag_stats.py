@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.tagstats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recounts how many posts carry each tag for the tag cloud"
+
+    def handle(self, *args, **options):
+        tags = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Counted posts for {tags} tags."))
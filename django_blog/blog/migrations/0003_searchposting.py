@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from blog.search import post_terms
+
+
+def index_existing_posts(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Post = apps.get_model('blog', 'Post')
+    SearchPosting = apps.get_model('blog', 'SearchPosting')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    post_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by('pk')[:500])
+        if not posts:
+            break
+        tags = {}
+        if post_type is not None:
+            for post_id, name in TaggedItem.objects.filter(
+                content_type=post_type, object_id__in=[post.pk for post in posts],
+            ).values_list('object_id', 'tag__name'):
+                tags.setdefault(post_id, []).append(name)
+        SearchPosting.objects.bulk_create(
+            [
+                SearchPosting(term=term, post=post, weight=weight)
+                for post in posts
+                for term, weight in post_terms(post, tags.get(post.pk, ())).items()
+            ],
+            batch_size=1000,
+        )
+        last_pk = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_tags'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('weight', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='blog.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', '-weight', 'post'], name='blog_posting_term_weight')],
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(index_existing_posts, migrations.RunPython.noop),
+    ]
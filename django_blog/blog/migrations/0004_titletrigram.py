@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from blog.search import trigrams
+
+
+def index_existing_titles(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    TitleTrigram = apps.get_model('blog', 'TitleTrigram')
+    rows = []
+    for post_id, title in Post.objects.order_by('pk').values_list('pk', 'title').iterator(chunk_size=1000):
+        grams = trigrams(title)
+        rows.extend(TitleTrigram(post_id=post_id, trigram=gram, total=len(grams)) for gram in grams)
+        if len(rows) >= 1000:
+            TitleTrigram.objects.bulk_create(rows, batch_size=1000)
+            rows = []
+    TitleTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_searchposting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('total', models.PositiveSmallIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='title_trigrams', to='blog.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'post'], name='blog_title_trigram_lookup')],
+                'unique_together': {('post', 'trigram')},
+            },
+        ),
+        migrations.RunPython(index_existing_titles, migrations.RunPython.noop),
+    ]
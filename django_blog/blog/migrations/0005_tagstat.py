@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_tag_stats(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TagStat = apps.get_model('blog', 'TagStat')
+    post_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if post_type is None:
+        return
+    counts = TaggedItem.objects.filter(content_type=post_type).order_by().values('tag').annotate(total=Count('pk'))
+    TagStat.objects.bulk_create(
+        [TagStat(tag_id=row['tag'], post_count=row['total']) for row in counts.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_titletrigram'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stat', serialize=False, to='taggit.tag')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-post_count', 'tag'], name='blog_tagstat_popular')],
+            },
+        ),
+        migrations.RunPython(populate_tag_stats, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from taggit.managers import TaggableManager
+from taggit.models import Tag
 
 class Post(models.Model):
     title = models.CharField(max_length=200)
@@ -23,3 +24,52 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
+
+
+class SearchPosting(models.Model):
+    """One entry of the search index: how strongly ``term`` points at ``post`` (see blog.search)."""
+    term = models.CharField(max_length=100)
+    post = models.ForeignKey(Post, related_name="search_postings", on_delete=models.CASCADE)
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('term', 'post')
+        indexes = [
+            # Scoring a query reads each term's postings, heaviest first
+            models.Index(fields=['term', '-weight', 'post'], name='blog_posting_term_weight'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.post_id} ({self.weight})"
+
+
+class TitleTrigram(models.Model):
+    """One trigram of a post title, for typo-tolerant search (see blog.search)."""
+    post = models.ForeignKey(Post, related_name="title_trigrams", on_delete=models.CASCADE)
+    trigram = models.CharField(max_length=3)
+    # Number of trigrams in the whole title, needed to score similarity
+    total = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('post', 'trigram')
+        indexes = [
+            models.Index(fields=['trigram', 'post'], name='blog_title_trigram_lookup'),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram!r} in {self.post}"
+
+
+class TagStat(models.Model):
+    """How many posts carry ``tag``, kept current by signals for the tag cloud (see blog.tagstats)."""
+    tag = models.OneToOneField(Tag, primary_key=True, related_name="stat", on_delete=models.CASCADE)
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # The tag cloud reads the most used tags first
+            models.Index(fields=['-post_count', 'tag'], name='blog_tagstat_popular'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag} ({self.post_count})"
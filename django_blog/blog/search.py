@@ -0,0 +1,183 @@
+"""
+Inverted index for blog search.
+
+Each post is broken into terms from its title, content and tags. One
+``SearchPosting`` row per (term, post) records how much that term says about
+the post. A tag counts for more than a title word, and a title word for more
+than a word in the body. A query only reads the postings of its own terms,
+so the cost grows with how common the searched words are, not with the size
+of the blog. Signals keep the index current and ``manage.py
+rebuild_search_index`` rebuilds it from scratch.
+
+Misspelled queries match no postings. For them, titles are matched by
+trigram similarity instead. Trigrams are pg_trgm-style three-letter windows
+of each word, stored in ``TitleTrigram``, and a title matches when it
+shares at least ``TRIGRAM_SIMILARITY_THRESHOLD`` of its trigrams with the
+query.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Sum
+from django.db.models.functions import Cast
+from taggit.models import TaggedItem
+
+from .models import Post, SearchPosting, TitleTrigram
+
+TAG_WEIGHT = 5
+TITLE_WEIGHT = 3
+CONTENT_WEIGHT = 1
+
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text):
+    """Split text into lowercase index terms, dropping stop words."""
+    return [
+        term for term in re.findall(r"\w+", (text or "").lower())
+        if term not in STOP_WORDS and len(term) <= 100
+    ]
+
+
+def post_terms(post, tag_names):
+    """Return ``{term: weight}`` for a post and the names of its tags."""
+    weights = Counter()
+    for term in tokenize(post.content):
+        weights[term] += CONTENT_WEIGHT
+    for term in tokenize(post.title):
+        weights[term] += TITLE_WEIGHT
+    for name in tag_names:
+        for term in tokenize(name):
+            weights[term] += TAG_WEIGHT
+    return weights
+
+
+def trigrams(text):
+    """Return the set of pg_trgm-style trigrams of ``text``."""
+    found = set()
+    for word in re.findall(r"[^\W_]+", (text or "").lower()):
+        padded = f"  {word} "
+        found.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return found
+
+
+def index_posts(posts):
+    """(Re)build the postings and title trigrams of the given posts."""
+    posts = list(posts)
+    tags = {}
+    for post_id, name in TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Post),
+        object_id__in=[post.pk for post in posts],
+    ).values_list("object_id", "tag__name"):
+        tags.setdefault(post_id, []).append(name)
+
+    with transaction.atomic():
+        SearchPosting.objects.filter(post__in=posts).delete()
+        SearchPosting.objects.bulk_create(
+            [
+                SearchPosting(term=term, post=post, weight=weight)
+                for post in posts
+                for term, weight in post_terms(post, tags.get(post.pk, ())).items()
+            ],
+            batch_size=1000,
+        )
+        TitleTrigram.objects.filter(post__in=posts).delete()
+        rows = []
+        for post in posts:
+            grams = trigrams(post.title)
+            rows.extend(TitleTrigram(post=post, trigram=gram, total=len(grams)) for gram in grams)
+        TitleTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+def get_similarity_threshold():
+    return getattr(settings, "TRIGRAM_SIMILARITY_THRESHOLD", 0.3)
+
+
+def fuzzy_title_hits(query, tag=None):
+    """
+    Return ``[{'post', 'score'}]`` for posts whose title is spelled like
+    ``query``, most similar first, with the similarity as the score.
+    """
+    grams = trigrams(query)
+    if not grams:
+        return []
+    threshold = get_similarity_threshold()
+    rows = TitleTrigram.objects.filter(trigram__in=grams)
+    if tag:
+        rows = rows.filter(post__tags__slug=tag)
+    # similarity <= shared / len(grams), so titles sharing fewer trigrams can't qualify
+    return list(
+        rows.values("post")
+        .annotate(shared=Count("trigram"), total=Max("total"))
+        .filter(shared__gte=math.ceil(threshold * len(grams)))
+        .annotate(score=Cast("shared", FloatField()) / (len(grams) + F("total") - F("shared")))
+        .filter(score__gte=threshold)
+        .order_by("-score", "-post")
+        .values("post", "score")[:get_facet_sample_size()]
+    )
+
+
+def get_page_size():
+    return getattr(settings, "BLOG_SEARCH_PAGE_SIZE", 10)
+
+
+def get_facet_limit():
+    return getattr(settings, "BLOG_SEARCH_FACET_LIMIT", 10)
+
+
+def get_facet_sample_size():
+    return getattr(settings, "BLOG_SEARCH_FACET_SAMPLE_SIZE", 1000)
+
+
+def search_posts(query, page=1, tag=None):
+    """
+    Return ``(page, facets)`` for a query.
+
+    ``page`` is a ``Page`` of posts that match every term (or, failing that,
+    whose titles are spelled like the query), best first, and each post
+    carries its ``search_score``. ``facets`` lists
+    ``{'name', 'slug', 'count'}`` for the most common tags among the best
+    ``BLOG_SEARCH_FACET_SAMPLE_SIZE`` hits. ``tag`` restricts hits to posts
+    with that tag slug.
+    """
+    terms = sorted(set(tokenize(query)))
+    hits = SearchPosting.objects.filter(term__in=terms)
+    if tag:
+        hits = hits.filter(post__tags__slug=tag)
+    hits = (
+        hits.values("post")
+        .annotate(score=Sum("weight"), matched=Count("term"))
+        .filter(matched=len(terms))
+        .order_by("-score", "-post")
+    )
+    if not terms:
+        hits = hits.none()
+    elif not hits.exists():
+        # Probably a typo; fall back to titles that are spelled similarly
+        hits = fuzzy_title_hits(query, tag)
+
+    paginator = Paginator(hits, get_page_size())
+    result_page = paginator.get_page(page)
+    scores = {hit["post"]: hit["score"] for hit in result_page.object_list}
+    posts = Post.objects.select_related("author").in_bulk(scores)
+    result_page.object_list = [posts[post_id] for post_id in scores if post_id in posts]
+    for post in result_page.object_list:
+        post.search_score = scores[post.pk]
+
+    # Facets come from the top of the ranking, so their cost is bounded too
+    sample = [hit["post"] for hit in hits[:get_facet_sample_size()]]
+    facets = list(
+        TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post), object_id__in=sample)
+        .values("tag__name", "tag__slug")
+        .annotate(count=Count("id"))
+        .order_by("-count", "tag__name")[:get_facet_limit()]
+    )
+    facets = [{"name": f["tag__name"], "slug": f["tag__slug"], "count": f["count"]} for f in facets]
+    return result_page, facets
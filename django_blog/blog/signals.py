@@ -0,0 +1,65 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from taggit.models import Tag
+
+from .models import Post
+from . import autocomplete, search, tagstats
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    search.index_posts([instance])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def index_retagged_post(sender, instance, action, **kwargs):
+    # Deleted posts drop their postings through the foreign key cascade
+    if isinstance(instance, Post) and action in ("post_add", "post_remove", "post_clear"):
+        search.index_posts([instance])
+
+
+@receiver(post_save, sender=Tag)
+def autocomplete_saved_tag(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.record_tag_change, instance.pk, instance.name))
+
+
+@receiver(post_delete, sender=Tag)
+def autocomplete_deleted_tag(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.record_tag_change, instance.pk, None))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def count_retagged_post(sender, instance, action, pk_set, **kwargs):
+    # taggit passes exactly the tags added or removed; clear() passes none
+    if not isinstance(instance, Post):
+        return
+    if action == "pre_clear":
+        instance._cleared_tag_ids = list(instance.tags.values_list("pk", flat=True))
+    elif action == "post_add":
+        tagstats.adjust_counts(pk_set, 1)
+    elif action == "post_remove":
+        tagstats.adjust_counts(pk_set, -1)
+    elif action == "post_clear":
+        tagstats.adjust_counts(instance.__dict__.pop("_cleared_tag_ids", ()), -1)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, **kwargs):
+    # The tagged items are deleted without m2m_changed, so count them first
+    instance._deleted_tag_ids = list(instance.tags.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    tagstats.adjust_counts(instance.__dict__.pop("_deleted_tag_ids", ()), -1)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Tag)
+def refresh_tag_cloud(sender, instance, created=False, **kwargs):
+    # New tags have no posts yet; renamed and deleted ones change the cloud
+    if not created:
+        transaction.on_commit(tagstats.invalidate)
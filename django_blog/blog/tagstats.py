@@ -0,0 +1,81 @@
+"""
+Tag usage counts for the tag cloud.
+
+``TagStat`` stores the number of posts carrying each tag. Signals adjust it
+by one when a post gains or loses a tag, so reading the most used tags is an
+indexed scan of a small table instead of an aggregate over every
+``TaggedItem``. The top tags are also cached for
+``BLOG_TAG_CLOUD_CACHE_TIMEOUT`` seconds. A change drops this process's cached
+copy once it commits; other processes see it when their copy expires. Run
+``manage.py rebuild_tag_stats`` to recount after bulk imports.
+"""
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from taggit.models import TaggedItem
+
+from .models import Post, TagStat
+
+CACHE_KEY = "blog:tag-cloud"
+
+
+def get_cloud_size():
+    return getattr(settings, "BLOG_TAG_CLOUD_SIZE", 20)
+
+
+def get_max_cloud_size():
+    return getattr(settings, "BLOG_TAG_CLOUD_MAX_SIZE", 100)
+
+
+def get_cache_timeout():
+    return getattr(settings, "BLOG_TAG_CLOUD_CACHE_TIMEOUT", 300)
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+def adjust_counts(tag_ids, delta):
+    """Add ``delta`` to the post count of each tag in ``tag_ids``."""
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    if delta > 0:
+        TagStat.objects.bulk_create([TagStat(tag_id=tag_id) for tag_id in tag_ids], ignore_conflicts=True)
+    TagStat.objects.filter(tag_id__in=tag_ids).update(post_count=Greatest(F("post_count") + delta, 0))
+    transaction.on_commit(invalidate)
+
+
+def rebuild():
+    """Recount every tag from ``TaggedItem``; return the number of tags in use."""
+    counts = (
+        TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post))
+        .order_by().values("tag").annotate(total=Count("pk"))
+    )
+    with transaction.atomic():
+        TagStat.objects.all().delete()
+        stats = TagStat.objects.bulk_create(
+            [TagStat(tag_id=row["tag"], post_count=row["total"]) for row in counts.iterator()],
+            batch_size=1000,
+        )
+    transaction.on_commit(invalidate)
+    return len(stats)
+
+
+def top_tags(limit=None):
+    """Return ``[{'name', 'slug', 'count'}]`` for the ``limit`` most used tags, most used first."""
+    if limit is None:
+        limit = get_cloud_size()
+    tags = cache.get(CACHE_KEY)
+    if tags is None:
+        tags = [
+            {"name": name, "slug": slug, "count": count}
+            for name, slug, count in TagStat.objects.filter(post_count__gt=0)
+            .order_by("-post_count", "tag")
+            .values_list("tag__name", "tag__slug", "post_count")[:get_max_cloud_size()]
+        ]
+        cache.set(CACHE_KEY, tags, get_cache_timeout())
+    return tags[:limit]
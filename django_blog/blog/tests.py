@@ -0,0 +1,224 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from taggit.models import Tag
+
+from . import autocomplete, tagstats
+from .models import Post, SearchPosting, TagStat
+from .search import search_posts
+from .views import autocomplete_tags, top_tags
+
+
+@override_settings(BLOG_SEARCH_PAGE_SIZE=2)
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="author", password="pass1234")
+        self.in_body = self.create_post("Weekend notes", "A short django tutorial", ["travel"])
+        self.in_title = self.create_post("Django tips", "Small things I learned", ["python"])
+        self.in_tag = self.create_post("Release notes", "What changed this month", ["django", "python"])
+
+    def create_post(self, title, content, tags):
+        post = Post.objects.create(title=title, content=content, author=self.user)
+        post.tags.add(*tags)
+        return post
+
+    def test_tags_outrank_titles_and_titles_outrank_content(self):
+        """Test hits are ordered by where the term appears, best first"""
+        page, facets = search_posts("django")
+        self.assertEqual(page.paginator.count, 3)
+        self.assertEqual(list(page.object_list), [self.in_tag, self.in_title])
+        self.assertEqual([post.search_score for post in page.object_list], [5, 3])
+        self.assertEqual(list(search_posts("django", page=2)[0].object_list), [self.in_body])
+
+    def test_every_term_must_match(self):
+        """Test multi-word queries only return posts containing all of their terms"""
+        page, facets = search_posts("the django tutorial")
+        self.assertEqual(list(page.object_list), [self.in_body])
+
+    def test_tag_filter(self):
+        """Test the tag filter drops hits without that tag"""
+        page, facets = search_posts("django", tag="python")
+        self.assertEqual(list(page.object_list), [self.in_tag, self.in_title])
+        self.assertEqual(search_posts("tutorial", tag="python")[0].paginator.count, 0)
+
+    def test_facet_counts(self):
+        """Test facets count the tags of every hit, not just the current page"""
+        page, facets = search_posts("django")
+        self.assertEqual(facets, [
+            {"name": "python", "slug": "python", "count": 2},
+            {"name": "django", "slug": "django", "count": 1},
+            {"name": "travel", "slug": "travel", "count": 1},
+        ])
+
+    def test_misspelled_queries_fall_back_to_titles(self):
+        """Test a query matching no postings returns titles spelled like it"""
+        page, facets = search_posts("djnago tips")
+        self.assertEqual(list(page.object_list), [self.in_title])
+
+    def test_index_follows_edits(self):
+        """Test saving, retagging and deleting a post updates its postings"""
+        self.in_body.title = "Trip report"
+        self.in_body.content = "Mountains"
+        self.in_body.save()
+        self.assertEqual(list(search_posts("django")[0].object_list), [self.in_tag, self.in_title])
+
+        self.in_body.tags.add("django")
+        self.assertEqual(search_posts("django")[0].paginator.count, 3)
+
+        self.in_tag.delete()
+        self.assertFalse(SearchPosting.objects.filter(post_id=self.in_tag.pk).exists())
+
+
+class TagAutocompleteTests(TestCase):
+    def setUp(self):
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+        self.user = User.objects.create_user(username="author", password="pass1234")
+        self.post = Post.objects.create(title="Tagged", content="...", author=self.user)
+        self.post.tags.add("Python", "pytest", "pyramid", "django")
+
+    def complete(self, prefix):
+        response = autocomplete_tags(RequestFactory().get("/tags/autocomplete/", {"q": prefix}))
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)["results"]
+
+    def test_prefix_matches_without_queries(self):
+        """Test suggestions are case-insensitive prefix matches served from memory"""
+        autocomplete.get_index()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete("PY"), ["pyramid", "pytest", "Python"])
+            self.assertEqual(self.complete("pyt"), ["pytest", "Python"])
+            self.assertEqual(self.complete("zz"), [])
+            self.assertEqual(self.complete(""), [])
+
+    @override_settings(BLOG_TAG_AUTOCOMPLETE_LIMIT=2)
+    def test_results_are_limited(self):
+        """Test at most BLOG_TAG_AUTOCOMPLETE_LIMIT tags are suggested"""
+        self.assertEqual(self.complete("py"), ["pyramid", "pytest"])
+
+    def test_index_follows_tag_changes(self):
+        """Test tags added to posts, renamed and deleted update the loaded index"""
+        autocomplete.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.add("pydantic")
+            tag = Tag.objects.get(name="pyramid")
+            tag.name = "flask"
+            tag.save()
+            Tag.objects.get(name="pytest").delete()
+        self.assertEqual(self.complete("py"), ["pydantic", "Python"])
+        self.assertEqual(self.complete("f"), ["flask"])
+
+    def test_removing_a_tag_from_a_post_keeps_the_suggestion(self):
+        """Test a tag removed from a post, but still existing, is still suggested"""
+        autocomplete.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.remove("pytest")
+        self.assertEqual(self.complete("pyt"), ["pytest", "Python"])
+
+    def test_reload_picks_up_changes_from_other_processes(self):
+        """Test a reload picks up tags that were written without signals"""
+        autocomplete.get_index()
+        # Written without signals, as another process's change would look here
+        Tag.objects.bulk_create([Tag(name="pyspark", slug="pyspark")])
+        self.assertNotIn("pyspark", self.complete("pys"))
+        autocomplete._reload()
+        self.assertEqual(self.complete("pys"), ["pyspark"])
+
+
+class TagStatTests(TestCase):
+    def setUp(self):
+        cache.delete(tagstats.CACHE_KEY)
+        self.addCleanup(cache.delete, tagstats.CACHE_KEY)
+        self.user = User.objects.create_user(username="author", password="pass1234")
+        self.first = Post.objects.create(title="First", content="...", author=self.user)
+        self.second = Post.objects.create(title="Second", content="...", author=self.user)
+
+    def counts(self):
+        return dict(TagStat.objects.filter(post_count__gt=0).values_list("tag__name", "post_count"))
+
+    def cloud(self):
+        response = top_tags(RequestFactory().get("/tags/top/"))
+        return [(tag["name"], tag["count"]) for tag in json.loads(response.content)["results"]]
+
+    def test_counts_follow_add_remove_and_clear(self):
+        """Test adding, removing and clearing tags adjusts each tag's post count"""
+        self.first.tags.add("python", "django")
+        self.second.tags.add("python")
+        self.assertEqual(self.counts(), {"python": 2, "django": 1})
+
+        self.first.tags.remove("python")
+        self.assertEqual(self.counts(), {"python": 1, "django": 1})
+
+        self.second.tags.clear()
+        self.assertEqual(self.counts(), {"django": 1})
+
+    def test_adding_an_existing_tag_does_not_count_twice(self):
+        """Test re-adding a tag a post already has leaves the count alone"""
+        self.first.tags.add("python")
+        self.first.tags.add("python")
+        self.first.tags.set(["python"])
+        self.assertEqual(self.counts(), {"python": 1})
+
+    def test_deleting_a_post_decrements_its_tags(self):
+        """Test deleting a post takes it out of its tags' counts"""
+        self.first.tags.add("python", "django")
+        self.second.tags.add("python")
+        self.first.delete()
+        self.assertEqual(self.counts(), {"python": 1})
+
+    def test_rebuild_matches_signal_counts(self):
+        """Test rebuild_tag_stats recounts to what the signals maintained"""
+        self.first.tags.add("python", "django")
+        self.second.tags.add("python")
+        expected = self.counts()
+        TagStat.objects.update(post_count=0)
+        self.assertEqual(tagstats.rebuild(), 2)
+        self.assertEqual(self.counts(), expected)
+
+    def test_cloud_is_cached_and_invalidated_on_commit(self):
+        """Test the cloud is served from cache until a tag change commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            # One at a time, so python gets the lower ID that breaks count ties
+            self.first.tags.add("python")
+            self.first.tags.add("django")
+            self.second.tags.add("python")
+        self.assertEqual(self.cloud(), [("python", 2), ("django", 1)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cloud(), [("python", 2), ("django", 1)])
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.second.tags.add("django")
+        # Not committed yet, so the cached cloud is still served
+        self.assertEqual(self.cloud(), [("python", 2), ("django", 1)])
+        for callback in callbacks:
+            callback()
+        # Ties keep the order the tags were created in
+        self.assertEqual(self.cloud(), [("python", 2), ("django", 2)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        self.assertEqual(self.cloud(), [("python", 1), ("django", 1)])
+
+    def test_renaming_a_tag_invalidates_the_cloud(self):
+        """Test renamed and deleted tags drop the cached cloud"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.tags.add("python")
+            self.first.tags.add("django")
+        self.cloud()
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.get(name="python")
+            tag.name = "py"
+            tag.save()
+        self.assertEqual(self.cloud(), [("py", 1), ("django", 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.get(name="django").delete()
+        self.assertEqual(self.cloud(), [("py", 1)])
+
+    @override_settings(BLOG_TAG_CLOUD_MAX_SIZE=3)
+    def test_cloud_limit_is_clamped(self):
+        """Test ?limit= is clamped to BLOG_TAG_CLOUD_MAX_SIZE"""
+        self.first.tags.add("a", "b", "c", "d")
+        response = top_tags(RequestFactory().get("/tags/top/", {"limit": "50"}))
+        self.assertEqual(len(json.loads(response.content)["results"]), 3)
@@ -12,7 +12,7 @@ from .views import (
     PostListView, PostDetailView, PostCreateView, 
     PostUpdateView, PostDeleteView,
     CommentCreateView, CommentUpdateView, CommentDeleteView,
-    register, profile, post_detail, search_posts
+    register, profile, post_detail, search_posts, autocomplete_tags, top_tags
 )
 
 urlpatterns = [
@@ -30,6 +30,8 @@ urlpatterns = [
 
     # Search and Tags URLs
     path('search/', search_posts, name='search-posts'),
+    path('tags/autocomplete/', autocomplete_tags, name='tag-autocomplete'),
+    path('tags/top/', top_tags, name='top-tags'),
     path('tags/<slug:tag_slug>/', PostByTagListView.as_view(), name='posts-by-tag'),
 
     # Auth URLs
@@ -1,13 +1,14 @@
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy, reverse
-from django.db.models import Q
 from taggit.models import Tag
 from .models import Post, Comment
 from .forms import UserRegistrationForm, UserUpdateForm, PostForm, CommentForm
+from . import autocomplete, search, tagstats
 
 
 # ----------------- Auth Views -----------------
@@ -150,14 +151,34 @@ class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
 def search_posts(request):
     query = request.GET.get('q')
-    results = []
+    tag = request.GET.get('tag')
+    results, facets = [], []
     if query:
-        results = Post.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct()
-    return render(request, "blog/search_results.html", {"results": results, "query": query})
+        # Ranked lookup in the inverted index instead of an icontains scan
+        results, facets = search.search_posts(query, page=request.GET.get('page'), tag=tag)
+    return render(request, "blog/search_results.html", {
+        "results": results,
+        "facets": facets,
+        "query": query,
+        "tag": tag,
+    })
+
+
+def autocomplete_tags(request):
+    # Called on every keystroke, so it answers from the in-memory index only
+    prefix = request.GET.get("q", "").strip()
+    names = autocomplete.get_index().complete(prefix, autocomplete.get_limit()) if prefix else []
+    return JsonResponse({"results": names})
+
+
+def top_tags(request):
+    # Served from the cached TagStat ranking, never by aggregating TaggedItem
+    try:
+        limit = int(request.GET.get("limit", tagstats.get_cloud_size()))
+    except ValueError:
+        limit = tagstats.get_cloud_size()
+    limit = max(1, min(limit, tagstats.get_max_cloud_size()))
+    return JsonResponse({"results": tagstats.top_tags(limit)})
 
 
 def posts_by_tag(request, tag_slug):
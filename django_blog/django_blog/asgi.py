@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_blog.settings')
 
 application = get_asgi_application()
+
+# Load the tag autocomplete index before the first request needs it
+from blog.autocomplete import get_index  # noqa: E402
+
+get_index()
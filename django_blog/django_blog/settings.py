@@ -64,6 +64,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.tag_cloud',
             ],
         },
     },
@@ -132,3 +133,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'post-list'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Blog search (blog.search): hits per results page, tag facets shown, and how
+# many of the best hits the facet counts are drawn from
+BLOG_SEARCH_PAGE_SIZE = 10
+BLOG_SEARCH_FACET_LIMIT = 10
+BLOG_SEARCH_FACET_SAMPLE_SIZE = 1000
+# Minimum trigram similarity (0-1) for a misspelled query to match a post title
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3
+
+# Tag autocomplete (blog.autocomplete): names suggested per keystroke, and seconds
+# before a process reloads its in-memory tag index in the background
+BLOG_TAG_AUTOCOMPLETE_LIMIT = 10
+BLOG_TAG_AUTOCOMPLETE_MAX_AGE = 300
+
+# Tag cloud (blog.tagstats): tags shown by default, the most /tags/top/?limit= may
+# ask for, and seconds other processes may show stale counts from their cache
+BLOG_TAG_CLOUD_SIZE = 20
+BLOG_TAG_CLOUD_MAX_SIZE = 100
+BLOG_TAG_CLOUD_CACHE_TIMEOUT = 300
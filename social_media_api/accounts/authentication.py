@@ -0,0 +1,139 @@
+"""
+Token authentication with a token -> user cache.
+
+``CachedTokenAuthentication`` is a drop-in replacement for DRF's
+``TokenAuthentication`` that skips the ``Token``/``CustomUser`` join for keys
+seen recently. Lookups are kept in a bounded in-process LRU for
+``TOKEN_AUTH_CACHE_TTL`` seconds and, if ``TOKEN_AUTH_SHARED_CACHE`` names a
+cache alias, in that shared cache as well.
+
+Entries hold plain field values, never model instances: every request gets
+its own freshly built ``user`` and ``token``, so a view that changes
+``request.user`` can't affect concurrent requests. The password hash is left
+out and loads on access like any deferred field.
+
+Deleting a token or saving a user (e.g. deactivating them) evicts the entry
+from this process's LRU and from the shared cache; other processes' LRUs
+catch up within ``TOKEN_AUTH_CACHE_TTL``, so keep it short when several
+processes serve requests.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+# Never copied into the cache; loaded from the database if a view reads it
+UNCACHED_USER_FIELDS = ('password',)
+
+
+class TokenCache:
+    """A thread-safe LRU of ``key -> credentials`` entries that expire after a TTL."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 30)
+
+    @property
+    def shared_cache(self):
+        alias = getattr(settings, 'TOKEN_AUTH_SHARED_CACHE', None)
+        return caches[alias] if alias else None
+
+    def _shared_key(self, key):
+        return f'accounts:token:{key}'
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, credentials = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return credentials
+                del self._entries[key]
+
+        if self.shared_cache is not None:
+            credentials = self.shared_cache.get(self._shared_key(key))
+            if credentials is not None:
+                self._store(key, credentials)
+                return credentials
+        return None
+
+    def set(self, key, credentials):
+        self._store(key, credentials)
+        if self.shared_cache is not None:
+            self.shared_cache.set(self._shared_key(key), credentials, self.ttl)
+
+    def _store(self, key, credentials):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, credentials)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.shared_cache is not None:
+            self.shared_cache.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def _user_field_names():
+    return [field.attname for field in User._meta.concrete_fields if field.attname not in UNCACHED_USER_FIELDS]
+
+
+def freeze_credentials(user, token):
+    """The cacheable form of a ``(user, token)`` pair: field values only."""
+    return {
+        'user': {name: getattr(user, name) for name in _user_field_names()},
+        'token_created': token.created,
+    }
+
+
+def thaw_credentials(key, credentials):
+    """Build a new ``(user, token)`` pair from ``freeze_credentials`` output."""
+    db = router.db_for_read(User)
+    values = credentials['user']
+    names = [name for name in _user_field_names() if name in values]
+    user = User.from_db(db, names, [values[name] for name in names])
+    token = Token.from_db(db, ['key', 'user_id', 'created'], [key, user.pk, credentials['token_created']])
+    token.user = user
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, freeze_credentials(user, token))
+            return user, token
+        user, token = thaw_credentials(key, credentials)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, token
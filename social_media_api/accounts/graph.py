@@ -0,0 +1,229 @@
+"""
+In-memory follow graph.
+
+The follow table is loaded into two compressed sparse row (CSR) adjacency
+arrays indexed by user ID, one for who each user follows and one for who
+follows them. Relationship queries become array slices and sorted-set
+operations instead of self-joins on the through table.
+
+Follows and unfollows committed by this process go into a small overlay
+straight away. They are folded into the arrays once the overlay holds
+``FOLLOW_GRAPH_COMPACT_THRESHOLD`` edges. Changes made by other processes
+show up when the graph is reloaded in the background, which happens once it
+is ``FOLLOW_GRAPH_MAX_AGE`` seconds old.
+"""
+import threading
+import time
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+
+User = get_user_model()
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def get_max_age():
+    return getattr(settings, 'FOLLOW_GRAPH_MAX_AGE', 300)
+
+
+def get_compact_threshold():
+    return getattr(settings, 'FOLLOW_GRAPH_COMPACT_THRESHOLD', 10000)
+
+
+class Adjacency:
+    """One direction of the graph: the sorted neighbour IDs of every user ID, in CSR form."""
+
+    def __init__(self, sources, targets, size):
+        order = np.lexsort((targets, sources))
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=size), out=self.indptr[1:])
+        self.indices = targets[order]
+
+    def neighbours(self, user_id):
+        if not 0 <= user_id < len(self.indptr) - 1:
+            return EMPTY
+        return self.indices[self.indptr[user_id]:self.indptr[user_id + 1]]
+
+    def edges(self):
+        """Return ``(sources, targets)`` arrays for every edge."""
+        sources = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        return sources, self.indices
+
+
+class FollowGraph:
+    """
+    The follow graph for ``followers[i]`` following ``followees[i]``.
+
+    Every query returns sorted NumPy arrays of user IDs, or counts.
+    """
+
+    def __init__(self, followers, followees):
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._build(np.asarray(followers, dtype=np.int64), np.asarray(followees, dtype=np.int64))
+
+    def _build(self, followers, followees):
+        size = int(max(followers.max(initial=0), followees.max(initial=0))) + 1
+        self._following = Adjacency(followers, followees, size)
+        self._followers = Adjacency(followees, followers, size)
+        # user ID -> {neighbour ID: edge present?}, overriding the arrays
+        self._following_overlay = {}
+        self._followers_overlay = {}
+        self._overlay_size = 0
+
+    @property
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    def apply(self, pairs, present):
+        """Record that each ``(follower, followee)`` pair was followed (``present``) or unfollowed."""
+        with self._lock:
+            for follower, followee in pairs:
+                self._following_overlay.setdefault(follower, {})[followee] = present
+                self._followers_overlay.setdefault(followee, {})[follower] = present
+                self._overlay_size += 1
+            if self._overlay_size >= get_compact_threshold():
+                self._compact()
+
+    def _compact(self):
+        """Fold the overlay into freshly built arrays."""
+        followers, followees = self._following.edges()
+        added, removed = [], []
+        for follower, overrides in self._following_overlay.items():
+            for followee, present in overrides.items():
+                (added if present else removed).append((follower, followee))
+        added = np.array(added, dtype=np.int64).reshape(-1, 2)
+        removed = np.array(removed, dtype=np.int64).reshape(-1, 2)
+
+        # Encode each edge as one integer so the set operations stay vectorized
+        stride = int(max(len(self._following.indptr) - 1, added.max(initial=0) + 1, removed.max(initial=0) + 1))
+        keys = followers * stride + followees
+        keys = keys[~np.isin(keys, removed[:, 0] * stride + removed[:, 1])]
+        keys = np.union1d(keys, added[:, 0] * stride + added[:, 1])
+        self._build(keys // stride, keys % stride)
+
+    def following_csr(self):
+        """Return the ``(indptr, indices)`` arrays of who each user follows, overlay included."""
+        with self._lock:
+            if self._overlay_size:
+                self._compact()
+            return self._following.indptr, self._following.indices
+
+    def _neighbours(self, direction, user_id):
+        # Read the arrays and the overlay together so a compaction can't split them
+        with self._lock:
+            base = getattr(self, f'_{direction}').neighbours(user_id)
+            overrides = dict(getattr(self, f'_{direction}_overlay').get(user_id, ()))
+        if not overrides:
+            return base
+        added = [other for other, present in overrides.items() if present]
+        removed = [other for other, present in overrides.items() if not present]
+        return np.union1d(np.setdiff1d(base, removed, assume_unique=True), added)
+
+    def following(self, user_id):
+        return self._neighbours('following', user_id)
+
+    def followers(self, user_id):
+        return self._neighbours('followers', user_id)
+
+    def following_count(self, user_id):
+        return len(self.following(user_id))
+
+    def followers_count(self, user_id):
+        return len(self.followers(user_id))
+
+    def follows(self, follower_id, followee_id):
+        following = self.following(follower_id)
+        position = np.searchsorted(following, followee_id)
+        return bool(position < len(following) and following[position] == followee_id)
+
+    def mutual_follows(self, user_id):
+        """Users who follow ``user_id`` and are followed back."""
+        return np.intersect1d(self.following(user_id), self.followers(user_id), assume_unique=True)
+
+    def followed_by_following(self, viewer_id, user_id):
+        """The people ``viewer_id`` follows who also follow ``user_id``."""
+        return np.intersect1d(self.following(viewer_id), self.followers(user_id), assume_unique=True)
+
+
+def load_graph():
+    """Build a ``FollowGraph`` from the follow table."""
+    # A row (from=X, to=Y) means Y follows X
+    rows = User.followers.through.objects.order_by().values_list('to_customuser_id', 'from_customuser_id')
+    flat = np.fromiter(chain.from_iterable(rows.iterator(chunk_size=10000)), dtype=np.int64)
+    pairs = flat.reshape(-1, 2)
+    return FollowGraph(pairs[:, 0], pairs[:, 1])
+
+
+_graph = None
+_graph_lock = threading.Lock()
+_load_lock = threading.Lock()
+# Changes recorded while a reload is running, replayed onto the new graph
+_pending = None
+_reloading = False
+
+
+def _reload():
+    global _graph, _pending, _reloading
+    with _graph_lock:
+        _pending = []
+    try:
+        graph = load_graph()
+        with _graph_lock:
+            for pairs, present in _pending:
+                graph.apply(pairs, present)
+            _graph = graph
+    finally:
+        with _graph_lock:
+            _pending = None
+            _reloading = False
+
+
+def _reload_in_background():
+    try:
+        _reload()
+    finally:
+        close_old_connections()
+
+
+def get_graph():
+    """
+    Return this process's follow graph, loading it on first use.
+
+    A graph older than ``FOLLOW_GRAPH_MAX_AGE`` is still returned, but a
+    reload is started in a background thread.
+    """
+    global _reloading
+    with _graph_lock:
+        graph = _graph
+        if graph is not None:
+            if graph.age > get_max_age() and not _reloading:
+                _reloading = True
+                threading.Thread(target=_reload_in_background, name='follow-graph-reload', daemon=True).start()
+            return graph
+    with _load_lock:
+        if _graph is None:
+            _reload()
+    return _graph
+
+
+def record_follow_changes(pairs, present):
+    """Apply committed ``(follower, followee)`` follows or unfollows to the loaded graph, if any."""
+    pairs = list(pairs)
+    with _graph_lock:
+        if _pending is not None:
+            _pending.append((pairs, present))
+        graph = _graph
+    if graph is not None:
+        graph.apply(pairs, present)
+
+
+def reset_graph():
+    """Drop the loaded graph; the next ``get_graph()`` reloads it."""
+    global _graph
+    with _graph_lock:
+        _graph = None
@@ -0,0 +1,65 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.graph import load_graph
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Compares follow-graph queries answered by the ORM with the in-memory graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200,
+                            help='Number of random user pairs to query')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Random seed for picking users')
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.values_list('id', flat=True))
+        if not user_ids:
+            self.stdout.write('No users to benchmark.')
+            return
+        rng = random.Random(options['seed'])
+        pairs = [(rng.choice(user_ids), rng.choice(user_ids)) for _ in range(options['samples'])]
+
+        started = time.perf_counter()
+        graph = load_graph()
+        self.stdout.write(f'Loaded graph in {(time.perf_counter() - started) * 1000:.1f} ms')
+
+        # ``User.filter(followers=u)`` are the users u follows, ``User.filter(following=u)`` its followers
+        queries = {
+            'follow counts': (
+                lambda viewer, user: (
+                    User.objects.filter(following=user).count(), User.objects.filter(followers=user).count()
+                ),
+                lambda viewer, user: (graph.followers_count(user), graph.following_count(user)),
+            ),
+            'mutual follows': (
+                lambda viewer, user: list(
+                    User.objects.filter(followers=user).filter(following=user).values_list('id', flat=True)
+                ),
+                lambda viewer, user: graph.mutual_follows(user),
+            ),
+            'followed by people you follow': (
+                lambda viewer, user: list(
+                    User.objects.filter(followers=viewer).filter(following=user).values_list('id', flat=True)
+                ),
+                lambda viewer, user: graph.followed_by_following(viewer, user),
+            ),
+        }
+        for name, (orm_query, graph_query) in queries.items():
+            orm_ms = self.time(orm_query, pairs)
+            graph_ms = self.time(graph_query, pairs)
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: ORM {orm_ms:.3f} ms/query, graph {graph_ms:.3f} ms/query '
+                f'({orm_ms / max(graph_ms, 1e-9):.0f}x)'
+            ))
+
+    def time(self, query, pairs):
+        started = time.perf_counter()
+        for viewer, user in pairs:
+            query(viewer, user)
+        return (time.perf_counter() - started) * 1000 / len(pairs)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Recomputes follower/following counters from the follow table and fixes any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of users checked per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted counters without fixing them')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        follow = User.followers.through
+        followers = (
+            follow.objects.filter(from_customuser=OuterRef('pk'))
+            .order_by().values('from_customuser').annotate(total=Count('pk')).values('total')
+        )
+        following = (
+            follow.objects.filter(to_customuser=OuterRef('pk'))
+            .order_by().values('to_customuser').annotate(total=Count('pk')).values('total')
+        )
+        last_pk = 0
+        checked = fixed = 0
+
+        while True:
+            with transaction.atomic():
+                # Walk the table in primary key order so each chunk is a cheap range scan
+                chunk = list(
+                    User.objects.filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .annotate(
+                        actual_followers=Coalesce(Subquery(followers), 0),
+                        actual_following=Coalesce(Subquery(following), 0),
+                    )
+                    .only('pk', 'followers_count', 'following_count')[:chunk_size]
+                )
+                if not chunk:
+                    break
+                drifted = [
+                    user for user in chunk
+                    if (user.followers_count, user.following_count) != (user.actual_followers, user.actual_following)
+                ]
+                for user in drifted:
+                    user.followers_count = user.actual_followers
+                    user.following_count = user.actual_following
+                if drifted and not options['dry_run']:
+                    User.objects.bulk_update(drifted, ['followers_count', 'following_count'])
+
+            checked += len(chunk)
+            fixed += len(drifted)
+            last_pk = chunk[-1].pk
+
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} users. {verb} {fixed} drifted follow counts.'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_follow_counts(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Follow = CustomUser.followers.through
+    followers = Follow.objects.filter(from_customuser=OuterRef('pk')).order_by().values('from_customuser').annotate(total=Count('pk')).values('total')
+    following = Follow.objects.filter(to_customuser=OuterRef('pk')).order_by().values('to_customuser').annotate(total=Count('pk')).values('total')
+    CustomUser.objects.update(
+        followers_count=Coalesce(Subquery(followers), 0),
+        following_count=Coalesce(Subquery(following), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_follow_counts, migrations.RunPython.noop),
+    ]
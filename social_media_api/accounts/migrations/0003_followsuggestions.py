@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_follow_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSuggestions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_suggestions', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('suggestions', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
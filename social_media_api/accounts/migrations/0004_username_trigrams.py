@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from posts.trigrams import trigrams
+
+
+def build_username_trigrams(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # pg_trgm indexes the column directly
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute('CREATE INDEX accounts_customuser_username_trgm ON accounts_customuser USING GIN (username gin_trgm_ops)')
+        return
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    UsernameTrigram = apps.get_model('accounts', 'UsernameTrigram')
+    rows = []
+    for pk, value in CustomUser.objects.values_list('pk', 'username').iterator():
+        grams = trigrams(value)
+        rows.extend(UsernameTrigram(user_id=pk, trigram=gram, total=len(grams)) for gram in grams)
+    UsernameTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+def drop_username_trigrams(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS accounts_customuser_username_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_followsuggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsernameTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('total', models.PositiveSmallIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='username_trigrams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'user'], name='accounts_username_trigram')],
+                'unique_together': {('user', 'trigram')},
+            },
+        ),
+        migrations.RunPython(build_username_trigrams, drop_username_trigrams),
+    ]
@@ -6,6 +6,37 @@ class CustomUser(AbstractUser):
 	bio = models.TextField(blank=True, null=True)
 	profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
 	followers = models.ManyToManyField('self', symmetrical=False, related_name='following', blank=True)
+	# Denormalized sizes of the follow graph around this user, kept in step by accounts.signals
+	followers_count = models.PositiveIntegerField(default=0, db_index=True)
+	following_count = models.PositiveIntegerField(default=0)
 
 	def __str__(self):
 		return self.username
+
+
+class FollowSuggestions(models.Model):
+	"""The top "who to follow" candidates for a user, precomputed by ``manage.py generate_follow_suggestions``."""
+	user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='follow_suggestions')
+	# [{"id": <user id>, "score": <number of people you follow who follow them>}, ...], best first
+	suggestions = models.JSONField(default=list)
+	computed_at = models.DateTimeField()
+
+	def __str__(self):
+		return f'Follow suggestions for {self.user}'
+
+
+class UsernameTrigram(models.Model):
+	"""One trigram of a username, for fuzzy user search where pg_trgm is unavailable (see posts.trigrams)."""
+	user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='username_trigrams')
+	trigram = models.CharField(max_length=3)
+	# Number of trigrams in the whole username, needed to score similarity
+	total = models.PositiveSmallIntegerField()
+
+	class Meta:
+		unique_together = ('user', 'trigram')
+		indexes = [
+			models.Index(fields=['trigram', 'user'], name='accounts_username_trigram'),
+		]
+
+	def __str__(self):
+		return f'{self.trigram!r} in {self.user}'
@@ -0,0 +1,35 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+
+from posts.pagination import KeysetPagination, parse_id
+
+
+class UserCursorPagination(KeysetPagination):
+    """
+    Opaque-cursor pagination over user IDs, highest first.
+
+    Follower and following lists are filtered on one side of the follow table,
+    whose unique ``(from, to)`` index already orders the other side by ID, so
+    each page is a plain index range scan.
+    """
+    ordering_fields = ('id',)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pk, = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return parse_id(pk)
+        except (TypeError, ValueError, OverflowError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj):
+        return base64.urlsafe_b64encode(json.dumps([obj.pk]).encode('ascii')).decode('ascii')
+
+    def get_position_filter(self, position):
+        return Q(id__lt=position)
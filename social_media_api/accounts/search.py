@@ -0,0 +1,9 @@
+from django.contrib.auth import get_user_model
+
+from posts.trigrams import TrigramIndex
+from .models import UsernameTrigram
+
+User = get_user_model()
+
+# Fuzzy username lookups: pg_trgm on Postgres, the UsernameTrigram table elsewhere
+usernames = TrigramIndex(User, 'username', UsernameTrigram, 'user')
@@ -38,7 +38,13 @@ class UserLoginSerializer(serializers.Serializer):
         raise serializers.ValidationError('Invalid credentials')
 
 class UserSerializer(serializers.ModelSerializer):
-    followers = serializers.StringRelatedField(many=True)
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'bio', 'profile_picture', 'followers')
+        fields = ('id', 'username', 'email', 'bio', 'profile_picture', 'followers_count', 'following_count')
+        read_only_fields = ('followers_count', 'following_count')
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Just enough of a user to render an entry in a follower or following list."""
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'profile_picture')
@@ -0,0 +1,94 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import autocomplete, graph
+from .authentication import token_cache
+from .search import usernames
+
+User = get_user_model()
+Follow = User.followers.through
+
+
+def evict_user_tokens(user_ids):
+    token_cache.invalidate(Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+@receiver(post_save, sender=Token)
+def evict_cached_token(sender, instance, **kwargs):
+    token_cache.invalidate([instance.key])
+
+
+@receiver(post_save, sender=User)
+def evict_cached_user_tokens(sender, instance, created, **kwargs):
+    # Deactivated or edited users must not be served from the token cache;
+    # deleted users take their token with them, which evicts it above
+    if not created:
+        evict_user_tokens([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def index_username(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is None or 'username' in update_fields:
+        usernames.index([instance])
+
+
+@receiver(post_save, sender=User)
+def autocomplete_saved_user(sender, instance, update_fields, **kwargs):
+    # Logins save last_login alone, which leaves the index as it is
+    if update_fields is not None and not {'username', 'is_active'} & set(update_fields):
+        return
+    username = instance.username if instance.is_active else None
+    transaction.on_commit(partial(autocomplete.record_username_change, instance.pk, username))
+
+
+@receiver(post_delete, sender=User)
+def autocomplete_deleted_user(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.record_username_change, instance.pk, None))
+
+
+def _existing_follow_ids(instance, reverse, pk_set):
+    if reverse:
+        rows = Follow.objects.filter(to_customuser_id=instance.pk)
+        column = 'from_customuser_id'
+    else:
+        rows = Follow.objects.filter(from_customuser_id=instance.pk)
+        column = 'to_customuser_id'
+    if pk_set is not None:
+        rows = rows.filter(**{f'{column}__in': pk_set})
+    return set(rows.values_list(column, flat=True))
+
+
+@receiver(m2m_changed, sender=Follow)
+def sync_follow_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    # A row (from=X, to=Y) means Y follows X. Forward changes go through
+    # ``instance.followers``, reverse ones through ``instance.following``.
+    if action in ('pre_remove', 'pre_clear'):
+        # Only rows that exist change the counts, and they are gone by post_*
+        instance._removed_follow_ids = _existing_follow_ids(instance, reverse, pk_set)
+        return
+    if action == 'post_add':
+        changed, delta = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        changed, delta = instance.__dict__.pop('_removed_follow_ids', set()), -1
+    else:
+        return
+    if not changed:
+        return
+
+    own_field, other_field = ('following_count', 'followers_count') if reverse else ('followers_count', 'following_count')
+    User.objects.filter(pk=instance.pk).update(**{own_field: Greatest(F(own_field) + delta * len(changed), 0)})
+    User.objects.filter(pk__in=changed).update(**{other_field: Greatest(F(other_field) + delta, 0)})
+    setattr(instance, own_field, max(getattr(instance, own_field) + delta * len(changed), 0))
+    # Both sides' cached users carry counts that just changed
+    evict_user_tokens([instance.pk, *changed])
+
+    pairs = [(instance.pk, pk) for pk in changed] if reverse else [(pk, instance.pk) for pk in changed]
+    transaction.on_commit(partial(graph.record_follow_changes, pairs, delta > 0))
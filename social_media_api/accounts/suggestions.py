@@ -0,0 +1,120 @@
+"""
+"Who to follow" suggestions.
+
+Candidates for a user are the accounts followed by the people they follow,
+scored by the number of such two-hop paths. For a shard of users that is
+their rows of A @ A, where A is the follow adjacency matrix. The product is
+computed with vectorized gathers over the CSR arrays of
+``accounts.graph``. ``generate_follow_suggestions`` spreads the shards over
+a process pool and stores each user's top ``FOLLOW_SUGGESTIONS_LIMIT``
+candidates, so serving them is a single primary key lookup.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .graph import load_graph
+from .models import FollowSuggestions
+
+User = get_user_model()
+
+
+def get_limit():
+    return getattr(settings, 'FOLLOW_SUGGESTIONS_LIMIT', 20)
+
+
+def get_shard_size():
+    return getattr(settings, 'FOLLOW_SUGGESTIONS_SHARD_SIZE', 1000)
+
+
+def _gather(indptr, indices, sources):
+    """Return ``(position in sources, neighbour ID)`` for every edge leaving ``sources``."""
+    size = len(indptr) - 1
+    valid = sources < size
+    clamped = np.minimum(sources, size - 1)
+    starts = np.where(valid, indptr[clamped], 0)
+    lengths = np.where(valid, indptr[clamped + 1] - starts, 0)
+    positions = np.repeat(np.arange(len(sources)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+    return positions, indices[offsets]
+
+
+def two_hop_suggestions(indptr, indices, user_ids, limit):
+    """
+    Return ``{user ID: [{'id': ..., 'score': ...}, ...]}`` for a shard of
+    users, best candidates first, leaving out the users themselves and
+    anyone they already follow.
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    size = len(indptr) - 1
+    rows, firsts = _gather(indptr, indices, user_ids)
+    hops, seconds = _gather(indptr, indices, firsts)
+
+    # Each (row, candidate) pair encoded as one integer; counting them is the sparse product
+    keys, scores = np.unique(rows[hops] * size + seconds, return_counts=True)
+    own = user_ids < size
+    excluded = np.concatenate([rows * size + firsts, np.flatnonzero(own) * size + user_ids[own]])
+    keep = ~np.isin(keys, excluded)
+    keys, scores = keys[keep], scores[keep]
+    rows, candidates = keys // size, keys % size
+
+    # Best score first within each row, lowest ID breaking ties, then keep the first ``limit``
+    order = np.lexsort((candidates, -scores, rows))
+    rows, candidates, scores = rows[order], candidates[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    top = rank < limit
+
+    results = {int(user_id): [] for user_id in user_ids}
+    for row, candidate, score in zip(rows[top].tolist(), candidates[top].tolist(), scores[top].tolist()):
+        results[int(user_ids[row])].append({'id': candidate, 'score': score})
+    return results
+
+
+_worker_state = None
+
+
+def _init_worker(indptr, indices, limit):
+    global _worker_state
+    _worker_state = (indptr, indices, limit)
+
+
+def _suggest_shard(user_ids):
+    indptr, indices, limit = _worker_state
+    return two_hop_suggestions(indptr, indices, user_ids, limit)
+
+
+def store_suggestions(results):
+    now = timezone.now()
+    FollowSuggestions.objects.bulk_create(
+        [FollowSuggestions(user_id=user_id, suggestions=suggestions, computed_at=now)
+         for user_id, suggestions in results.items()],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['suggestions', 'computed_at'],
+    )
+
+
+def generate_suggestions(workers=None, shard_size=None, limit=None):
+    """
+    Recompute and store suggestions for every active user; return how many
+    users were processed. ``workers=0`` computes the shards in this process.
+    """
+    shard_size = shard_size or get_shard_size()
+    limit = limit or get_limit()
+    indptr, indices = load_graph().following_csr()
+    user_ids = list(User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+    shards = [user_ids[start:start + shard_size] for start in range(0, len(user_ids), shard_size)]
+
+    if workers == 0:
+        _init_worker(indptr, indices, limit)
+        for shard in shards:
+            store_suggestions(_suggest_shard(shard))
+    else:
+        # Workers only crunch arrays; results are written back from this process
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(indptr, indices, limit)) as pool:
+            for results in pool.map(_suggest_shard, shards):
+                store_suggestions(results)
+    return len(user_ids)
@@ -1,3 +1,452 @@
-from django.test import TestCase
+import base64
+import json
+from django.contrib.auth import get_user_model
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connections
+from django.db.models.signals import m2m_changed
+from django.test import TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from notifications.models import Notification
+from posts.models import Post, TimelineEntry
+from . import autocomplete, graph
+from .models import FollowSuggestions
+from .suggestions import two_hop_suggestions
+from posts.trigrams import trigrams
+from .authentication import CachedTokenAuthentication, token_cache
 
-# Create your tests here.
+User = get_user_model()
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pass1234')
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+
+    def authenticate(self, key=None):
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f'Token {key or self.token.key}')
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_repeated_lookups_hit_the_cache(self):
+        """Test only the first request for a token queries the database"""
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual(user, self.user)
+
+    def test_deleted_token_is_rejected(self):
+        """Test deleting a token evicts it from the cache"""
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(self.token.key)
+
+    def test_deactivated_user_is_rejected(self):
+        """Test deactivating a user evicts their token from the cache"""
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(TOKEN_AUTH_CACHE_SIZE=1)
+    def test_cache_is_bounded(self):
+        """Test the least recently used token is dropped when the cache is full"""
+        other = Token.objects.create(user=User.objects.create_user(username='other', password='pass1234'))
+        self.authenticate()
+        self.authenticate(other.key)
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    @override_settings(TOKEN_AUTH_CACHE_TTL=0)
+    def test_expired_entries_are_reloaded(self):
+        """Test entries older than the TTL are looked up again"""
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_cached_lookups_build_fresh_users(self):
+        """Test cached requests never share user objects, and the password hash isn't cached"""
+        self.authenticate()
+        first, _ = self.authenticate()
+        first.username = 'changed'
+        second, token = self.authenticate()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.username, 'reader')
+        self.assertEqual(token.user, second)
+        self.assertNotIn('password', token_cache.get(self.token.key)['user'])
+        self.assertTrue(second.check_password('pass1234'))
+
+    def test_follows_evict_both_users(self):
+        """Test a follow refreshes the cached counts of the follower and the followed user"""
+        followed = User.objects.create_user(username='followed', password='pass1234')
+        followed_token = Token.objects.create(user=followed)
+        self.authenticate()
+        self.authenticate(followed_token.key)
+        followed.followers.add(self.user)
+        self.assertEqual(self.authenticate()[0].following_count, 1)
+        self.assertEqual(self.authenticate(followed_token.key)[0].followers_count, 1)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE='default')
+    def test_shared_cache_fills_local_misses(self):
+        """Test a token cached by another process is served from the shared cache"""
+        self.authenticate()
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(self.token.key)
+
+class FollowListTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass1234') for i in range(5)]
+        self.author.followers.add(*self.fans)
+        self.fans[0].followers.add(self.author)
+
+    def test_profile_reports_counts(self):
+        """Test the user serializer returns follower counts instead of the follower list"""
+        response = self.client.get(reverse('user-detail', args=[self.author.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('followers', response.data)
+        self.assertEqual(response.data['followers_count'], 5)
+        self.assertEqual(response.data['following_count'], 1)
+
+    def test_followers_are_cursor_paginated(self):
+        """Test walking the follower list page by page"""
+        url = reverse('user-followers', args=[self.author.pk])
+        seen = []
+        while url:
+            response = self.client.get(url, {'page_size': 2} if not seen else None)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(user['id'] for user in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, sorted((fan.pk for fan in self.fans), reverse=True))
+
+    def test_following_list(self):
+        """Test the following list returns the users a user follows"""
+        response = self.client.get(reverse('user-following', args=[self.fans[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['username'] for user in response.data['results']], ['author'])
+        self.assertIsNone(response.data['next'])
+
+    def test_unknown_user_and_bad_cursor(self):
+        """Test missing users and malformed cursors return 404"""
+        self.assertEqual(self.client.get(reverse('user-followers', args=[9999])).status_code, 404)
+        url = reverse('user-followers', args=[self.author.pk])
+        self.assertEqual(self.client.get(url, {'cursor': 'nope'}).status_code, 404)
+        # Infinity and IDs no database column can hold are rejected too
+        for position in ([float('inf')], [1e300], [10 ** 30]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+            self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 404, position)
+
+class FollowCountTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [User.objects.create_user(username=f'user{i}', password='pass1234') for i in range(4)]
+        self.user, self.other = self.users[:2]
+
+    def assertCountsMatchGraph(self):
+        for user in User.objects.all():
+            self.assertEqual(user.followers_count, user.followers.count(), user.username)
+            self.assertEqual(user.following_count, user.following.count(), user.username)
+
+    def test_follow_and_unfollow_views_update_counts(self):
+        """Test following and unfollowing through the API keeps both counters in step"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('follow-user', args=[self.other.pk]))
+        self.client.post(reverse('follow-user', args=[self.other.pk]))
+        self.assertCountsMatchGraph()
+        self.assertEqual(User.objects.get(pk=self.user.pk).followers_count, 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.other, verb='started following').count(), 1)
+        self.client.post(reverse('unfollow-user', args=[self.other.pk]))
+        self.client.post(reverse('unfollow-user', args=[self.other.pk]))
+        self.assertCountsMatchGraph()
+        self.assertEqual(User.objects.get(pk=self.other.pk).following_count, 0)
+
+    def test_other_writers_update_counts(self):
+        """Test forward, reverse and clear changes to the follow graph all update the counters"""
+        self.user.followers.add(*self.users[1:])
+        self.other.following.add(self.users[2], self.users[3])
+        self.assertCountsMatchGraph()
+        self.user.followers.remove(self.users[2], self.users[2])
+        self.other.following.remove(self.users[1])  # not followed, nothing changes
+        self.assertCountsMatchGraph()
+        self.other.following.clear()
+        self.user.followers.clear()
+        self.assertCountsMatchGraph()
+        self.assertEqual(User.objects.get(pk=self.user.pk).followers_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        """Test the reconcile command recomputes drifted counters"""
+        self.user.followers.add(self.other, self.users[2])
+        User.objects.filter(pk=self.user.pk).update(followers_count=7)
+        User.objects.filter(pk=self.other.pk).update(following_count=0)
+        out = StringIO()
+        call_command('reconcile_follow_counts', '--chunk-size', '2', stdout=out)
+        self.assertIn('Fixed 2 drifted', out.getvalue())
+        self.assertCountsMatchGraph()
+
+class FollowGraphTests(APITestCase):
+    def setUp(self):
+        graph.reset_graph()
+        self.addCleanup(graph.reset_graph)
+        self.users = [User.objects.create_user(username=f'user{i}', password='pass1234') for i in range(5)]
+        a, b, c, d, e = self.users
+        # b, c and d follow a; a follows b and c; d follows c and e
+        a.followers.add(b, c, d)
+        a.following.add(b, c)
+        d.following.add(c, e)
+
+    def ids(self, *users):
+        return [user.pk for user in users]
+
+    def test_graph_matches_orm(self):
+        """Test graph queries agree with the equivalent ORM queries"""
+        follow_graph = graph.get_graph()
+        for user in self.users:
+            self.assertEqual(follow_graph.followers(user.pk).tolist(), sorted(user.followers.values_list('id', flat=True)))
+            self.assertEqual(follow_graph.following(user.pk).tolist(), sorted(user.following.values_list('id', flat=True)))
+        a, b, c, d, e = self.users
+        self.assertEqual(follow_graph.mutual_follows(a.pk).tolist(), self.ids(b, c))
+        self.assertEqual(follow_graph.followed_by_following(d.pk, a.pk).tolist(), self.ids(c))
+        self.assertTrue(follow_graph.follows(d.pk, e.pk))
+        self.assertFalse(follow_graph.follows(e.pk, d.pk))
+        self.assertEqual(follow_graph.followers_count(9999), 0)
+
+    @override_settings(FOLLOW_GRAPH_COMPACT_THRESHOLD=2)
+    def test_committed_follows_update_loaded_graph(self):
+        """Test follows and unfollows are applied to the loaded graph without a reload"""
+        follow_graph = graph.get_graph()
+        a, b, c, d, e = self.users
+        with self.captureOnCommitCallbacks(execute=True):
+            e.followers.add(a, b, c)
+            a.followers.remove(b)
+        self.assertIs(graph.get_graph(), follow_graph)
+        self.assertEqual(follow_graph.followers(e.pk).tolist(), self.ids(a, b, c, d))
+        self.assertEqual(follow_graph.following(b.pk).tolist(), self.ids(e))
+        self.assertEqual(follow_graph.mutual_follows(a.pk).tolist(), self.ids(c))
+
+    def test_relationship_endpoint(self):
+        """Test the relationship endpoint answers from the graph"""
+        a, b, c, d, e = self.users
+        self.client.force_authenticate(user=d)
+        response = self.client.get(reverse('user-relationship', args=[a.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['followers_count'], 3)
+        self.assertEqual(response.data['following_count'], 2)
+        self.assertEqual(response.data['mutual_follows_count'], 2)
+        self.assertTrue(response.data['you_follow'])
+        self.assertFalse(response.data['follows_you'])
+        self.assertEqual(response.data['followed_by_following_count'], 1)
+        self.assertEqual([user['username'] for user in response.data['followed_by_following']], ['user2'])
+
+    def test_benchmark_command(self):
+        """Test the benchmark command reports every query"""
+        out = StringIO()
+        call_command('benchmark_follow_graph', '--samples', '5', '--seed', '1', stdout=out)
+        self.assertIn('mutual follows', out.getvalue())
+        self.assertIn('followed by people you follow', out.getvalue())
+
+class FollowSuggestionTests(APITestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{i}', password='pass1234') for i in range(6)]
+        a, b, c, d, e, f = self.users
+        # a follows b and c; b and c both follow d; c follows e and a; d follows f
+        a.following.add(b, c)
+        b.following.add(d)
+        c.following.add(d, e, a)
+        d.following.add(f)
+
+    def test_scores_match_brute_force(self):
+        """Test two-hop scores agree with counting paths through the ORM"""
+        indptr, indices = graph.load_graph().following_csr()
+        ids = [user.pk for user in self.users] + [9999]
+        results = two_hop_suggestions(indptr, indices, ids, limit=10)
+        for user in self.users:
+            followed = set(user.following.values_list('id', flat=True))
+            expected = {}
+            for friend in user.following.all():
+                for candidate in friend.following.values_list('id', flat=True):
+                    if candidate != user.pk and candidate not in followed:
+                        expected[candidate] = expected.get(candidate, 0) + 1
+            expected = sorted(expected.items(), key=lambda item: (-item[1], item[0]))
+            self.assertEqual([(s['id'], s['score']) for s in results[user.pk]], expected)
+        self.assertEqual(results[9999], [])
+
+    def test_limit(self):
+        """Test only the best candidates are kept"""
+        indptr, indices = graph.load_graph().following_csr()
+        a = self.users[0]
+        results = two_hop_suggestions(indptr, indices, [a.pk], limit=1)
+        self.assertEqual(results[a.pk], [{'id': self.users[3].pk, 'score': 2}])
+
+    def test_generate_and_serve(self):
+        """Test the batch job stores suggestions that the endpoint serves"""
+        a, b, c, d, e, f = self.users
+        call_command('generate_follow_suggestions', '--workers', '0', '--shard-size', '2', stdout=StringIO())
+        call_command('generate_follow_suggestions', '--workers', '0', stdout=StringIO())
+        self.assertEqual(FollowSuggestions.objects.count(), len(self.users))
+        self.client.force_authenticate(user=a)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('follow-suggestions'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(u['username'], u['score']) for u in response.data['results']], [('user3', 2), ('user4', 1)])
+
+        a.following.add(d)
+        response = self.client.get(reverse('follow-suggestions'))
+        self.assertEqual([u['username'] for u in response.data['results']], ['user4'])
+
+    def test_process_pool(self):
+        """Test shards scored in worker processes give the same result"""
+        call_command('generate_follow_suggestions', '--workers', '2', '--shard-size', '2', stdout=StringIO())
+        stored = FollowSuggestions.objects.get(user=self.users[0]).suggestions
+        self.assertEqual(stored, [{'id': self.users[3].pk, 'score': 2}, {'id': self.users[4].pk, 'score': 1}])
+
+# Needs a test database that several threads can open at once
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentFollowTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='follower', password='pass1234')
+        self.other = User.objects.create_user(username='followed', password='pass1234')
+        Post.objects.create(author=self.user, title='Existing', content='Content')
+
+    def follow(self, _):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        try:
+            return client.post(reverse('follow-user', args=[self.other.pk])).status_code
+        finally:
+            connections.close_all()
+
+    def test_concurrent_follows_are_idempotent(self):
+        """Test simultaneous follows insert one row, bump counters once and notify once"""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            codes = list(pool.map(self.follow, range(32)))
+        self.assertEqual(set(codes), {200})
+        self.assertEqual(list(self.user.followers.all()), [self.other])
+        self.user.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.user.followers_count, self.other.following_count), (1, 1))
+        self.assertEqual(Notification.objects.filter(recipient=self.other, verb='started following').count(), 1)
+        # The other m2m_changed receivers ran too: the timeline was backfilled
+        self.assertEqual(TimelineEntry.objects.filter(user=self.other).count(), 1)
+
+class UserSearchTests(APITestCase):
+    def setUp(self):
+        for username in ('johnathan', 'jonathan_smith', 'maria', 'marianne'):
+            User.objects.create_user(username=username, password='pass1234')
+
+    def search(self, query):
+        response = self.client.get(reverse('user-search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data]
+
+    def test_trigrams_match_pg_trgm(self):
+        """Test trigrams are built the way pg_trgm builds them"""
+        self.assertEqual(trigrams('Cat'), {'  c', ' ca', 'cat', 'at '})
+        self.assertEqual(trigrams('a-b'), {'  a', ' a ', '  b', ' b '})
+
+    def test_misspelled_usernames_match(self):
+        """Test typos still find the user, closest spelling first"""
+        self.assertEqual(self.search('johnatan'), ['johnathan'])
+        self.assertEqual(self.search('jonathan'), ['jonathan_smith', 'johnathan'])
+        self.assertEqual(self.search('mariana'), ['maria', 'marianne'])
+        self.assertEqual(self.search(''), [])
+
+    def test_renamed_users_are_reindexed(self):
+        """Test username changes update the trigram index"""
+        user = User.objects.get(username='maria')
+        user.username = 'roberto'
+        user.save()
+        self.assertEqual(self.search('robert'), ['roberto'])
+        self.assertEqual(self.search('maria'), ['marianne'])
+
+    @override_settings(TRIGRAM_SIMILARITY_THRESHOLD=0.8)
+    def test_threshold_is_configurable(self):
+        """Test a stricter threshold rejects looser matches"""
+        self.assertEqual(self.search('mariana'), [])
+
+class UsernameAutocompleteTests(APITestCase):
+    def setUp(self):
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+        for username in ('Maria', 'marianne', 'mark', 'zoe'):
+            User.objects.create_user(username=username, password='pass1234')
+
+    def complete(self, prefix):
+        response = self.client.get(reverse('username-autocomplete'), {'q': prefix})
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data['results']]
+
+    def test_prefix_matches_without_queries(self):
+        """Test suggestions are case-insensitive prefix matches served from memory"""
+        autocomplete.get_index()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('MAR'), ['Maria', 'marianne', 'mark'])
+            self.assertEqual(self.complete('maria'), ['Maria', 'marianne'])
+            self.assertEqual(self.complete('zz'), [])
+            self.assertEqual(self.complete(''), [])
+
+    @override_settings(USERNAME_AUTOCOMPLETE_LIMIT=2)
+    def test_results_are_limited(self):
+        """Test at most USERNAME_AUTOCOMPLETE_LIMIT users are suggested"""
+        self.assertEqual(self.complete('m'), ['Maria', 'marianne'])
+
+    def test_index_follows_user_changes(self):
+        """Test renamed, deactivated and deleted users update the loaded index"""
+        autocomplete.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username='martin', password='pass1234')
+            user = User.objects.get(username='mark')
+            user.username = 'zack'
+            user.save()
+            marianne = User.objects.get(username='marianne')
+            marianne.is_active = False
+            marianne.save()
+            User.objects.get(username='zoe').delete()
+        self.assertEqual(self.complete('mar'), ['Maria', 'martin'])
+        self.assertEqual(self.complete('z'), ['zack'])
+
+class RepeatedFollowTests(APITestCase):
+    """The race ConcurrentFollowTests covers, serialized on one connection so it also runs on SQLite."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='follower', password='pass1234')
+        self.other = User.objects.create_user(username='followed', password='pass1234')
+        Post.objects.create(author=self.user, title='Existing', content='Content')
+        self.client.force_authenticate(user=self.user)
+        self.post_adds = []
+        m2m_changed.connect(self.record_post_add, sender=User.followers.through)
+        self.addCleanup(m2m_changed.disconnect, self.record_post_add, sender=User.followers.through)
+
+    def record_post_add(self, action, pk_set, **kwargs):
+        if action == 'post_add':
+            self.post_adds.append(set(pk_set))
+
+    def test_repeated_follows_insert_one_row_and_signal_once(self):
+        """Test repeated follows insert one row, send post_add once, bump counters once and notify once"""
+        for _ in range(5):
+            response = self.client.post(reverse('follow-user', args=[self.other.pk]))
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.user.followers.all()), [self.other])
+        self.assertEqual(self.post_adds, [{self.other.pk}])
+        self.user.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.user.followers_count, self.other.following_count), (1, 1))
+        self.assertEqual(Notification.objects.filter(recipient=self.other, verb='started following').count(), 1)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.other).count(), 1)
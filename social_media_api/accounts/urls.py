@@ -1,11 +1,21 @@
 from django.urls import path
-from .views import RegisterView, LoginView, UserDetailView, ProfileView, FollowUserView, UnfollowUserView
+from .views import (
+    RegisterView, LoginView, UserDetailView, ProfileView, FollowUserView, UnfollowUserView,
+    FollowersListView, FollowingListView, RelationshipView, SuggestionsView,
+    UserSearchView, UsernameAutocompleteView,
+)
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('profile/', ProfileView.as_view(), name='profile'),
     path('user/<int:pk>/', UserDetailView.as_view(), name='user-detail'),
+    path('user/<int:pk>/followers/', FollowersListView.as_view(), name='user-followers'),
+    path('user/<int:pk>/following/', FollowingListView.as_view(), name='user-following'),
+    path('user/<int:pk>/relationship/', RelationshipView.as_view(), name='user-relationship'),
+    path('suggestions/', SuggestionsView.as_view(), name='follow-suggestions'),
+    path('search/', UserSearchView.as_view(), name='user-search'),
+    path('autocomplete/', UsernameAutocompleteView.as_view(), name='username-autocomplete'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow-user'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user'),
 ]
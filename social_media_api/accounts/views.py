@@ -3,12 +3,22 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import permissions
 from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
 from django.contrib.auth import get_user_model
-from notifications.models import Notification
-from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
-from .models import CustomUser
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+from django.shortcuts import get_object_or_404
+from notifications.dispatch import notify
+from posts.upserts import insert_if_absent
+from . import autocomplete
+from .graph import get_graph
+from .pagination import UserCursorPagination
+from .search import usernames
+from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer, UserSummarySerializer
+from .models import CustomUser, FollowSuggestions
 
 User = get_user_model()
+Follow = User.followers.through
 
 class RegisterView(generics.CreateAPIView):
 	queryset = User.objects.all()
@@ -39,6 +49,24 @@ class UserDetailView(generics.RetrieveAPIView):
 	queryset = User.objects.all()
 	serializer_class = UserSerializer
 
+class FollowersListView(generics.ListAPIView):
+    """The users following a user, a page at a time."""
+    serializer_class = UserSummarySerializer
+    pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        user = get_object_or_404(User, pk=self.kwargs['pk'])
+        return user.followers.only('id', 'username', 'profile_picture')
+
+class FollowingListView(generics.ListAPIView):
+    """The users a user follows, a page at a time."""
+    serializer_class = UserSummarySerializer
+    pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        user = get_object_or_404(User, pk=self.kwargs['pk'])
+        return user.following.only('id', 'username', 'profile_picture')
+
 class ProfileView(APIView):
 	permission_classes = [permissions.IsAuthenticated]
 
@@ -65,14 +93,17 @@ class FollowUserView(generics.GenericAPIView):
             return Response({'error': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
         if to_follow == request.user:
             return Response({'error': 'You cannot follow yourself.'}, status=status.HTTP_400_BAD_REQUEST)
-        request.user.followers.add(to_follow)
-        # Create notification for the user being followed
-        Notification.objects.create(
-            recipient=to_follow,
-            actor=request.user,
-            verb='started following',
-            target=to_follow
-        )
+        # The follow row and both users' counters change together
+        with transaction.atomic():
+            created = insert_if_absent(Follow, from_customuser=request.user, to_customuser=to_follow)
+            if created:
+                # Same signal followers.add() sends, for the timeline, counter and graph receivers
+                m2m_changed.send(
+                    sender=Follow, action='post_add', instance=request.user, reverse=False,
+                    model=User, pk_set={to_follow.pk}, using=router.db_for_write(Follow),
+                )
+                # Queue notification for the user being followed
+                notify(to_follow, request.user, 'started following', to_follow)
         return Response({'success': f'You are now following {to_follow.username}.'})
 
 class UnfollowUserView(generics.GenericAPIView):
@@ -84,5 +115,71 @@ class UnfollowUserView(generics.GenericAPIView):
             to_unfollow = self.get_queryset().get(id=user_id)
         except User.DoesNotExist:
             return Response({'error': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
-        request.user.followers.remove(to_unfollow)
-        return Response({'success': f'You have unfollowed {to_unfollow.username}.'})
\ No newline at end of file
+        with transaction.atomic():
+            request.user.followers.remove(to_unfollow)
+        return Response({'success': f'You have unfollowed {to_unfollow.username}.'})
+
+class RelationshipView(APIView):
+    """How the requesting user and another user are connected, answered from the in-memory follow graph."""
+    permission_classes = [permissions.IsAuthenticated]
+    sample_size = 3
+
+    def get(self, request, pk):
+        user = get_object_or_404(User.objects.only('id'), pk=pk)
+        graph = get_graph()
+        followed_by = graph.followed_by_following(request.user.pk, user.pk)
+        sample = User.objects.filter(pk__in=followed_by[-self.sample_size:].tolist()).order_by('-id')
+        return Response({
+            'id': user.pk,
+            'followers_count': graph.followers_count(user.pk),
+            'following_count': graph.following_count(user.pk),
+            'mutual_follows_count': len(graph.mutual_follows(user.pk)),
+            'you_follow': graph.follows(request.user.pk, user.pk),
+            'follows_you': graph.follows(user.pk, request.user.pk),
+            'followed_by_following_count': len(followed_by),
+            'followed_by_following': UserSummarySerializer(sample, many=True).data,
+        })
+
+class SuggestionsView(APIView):
+    """The requesting user's precomputed "who to follow" suggestions."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        stored = FollowSuggestions.objects.filter(user=request.user).first()
+        if stored is None:
+            return Response({'computed_at': None, 'results': []})
+        scores = {suggestion['id']: suggestion['score'] for suggestion in stored.suggestions}
+        # Skip accounts followed or deactivated since the batch ran
+        users = User.objects.filter(pk__in=scores, is_active=True).exclude(followers=request.user)
+        users = sorted(users.only('id', 'username', 'profile_picture'), key=lambda user: (-scores[user.pk], user.pk))
+        results = UserSummarySerializer(users, many=True).data
+        for result in results:
+            result['score'] = scores[result['id']]
+        return Response({'computed_at': stored.computed_at, 'results': results})
+
+class UserSearchView(generics.ListAPIView):
+    """Users whose username looks like ``?q=``, tolerating typos, most similar first."""
+    serializer_class = UserSummarySerializer
+    pagination_class = None
+    max_results = 20
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            return User.objects.none()
+        users = User.objects.filter(is_active=True).only('id', 'username', 'profile_picture')
+        return usernames.search(query, users)[:self.max_results]
+
+class UsernameAutocompleteView(APIView):
+    """Usernames starting with ``?q=``, answered from the in-memory prefix index without touching the database."""
+    # Typed on every keystroke: skip authentication and content negotiation work
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    renderer_classes = [JSONRenderer]
+
+    def get(self, request):
+        prefix = request.query_params.get('q', '').strip()
+        if not prefix:
+            return Response({'results': []})
+        matches = autocomplete.get_index().complete(prefix, autocomplete.get_limit())
+        return Response({'results': [{'id': pk, 'username': username} for pk, username in matches]})
@@ -17,3 +17,10 @@ loglevel = "info"
 pidfile = "/run/gunicorn/gunicorn.pid"
 daemon = False
 preload_app = True
+
+
+def post_worker_init(worker):
+    # Load the username autocomplete index before the worker takes requests;
+    # it is not loaded in the master so no database connection crosses the fork
+    from accounts.autocomplete import get_index
+    get_index()
@@ -0,0 +1,42 @@
+"""
+In-process wake-ups for notification streams.
+
+Each open stream waits on an ``asyncio.Event`` registered for its user.
+``publish`` sets the events of the given recipients from any thread, so a
+stream served by the same process wakes up right after a notification is
+written. Streams in other processes notice new rows on their next poll.
+"""
+import asyncio
+import threading
+
+_waiters = {}
+_lock = threading.Lock()
+
+
+async def wait(user_id, timeout):
+    """Wait until ``publish`` mentions ``user_id``; return False on timeout."""
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+    waiter = (loop, event)
+    with _lock:
+        _waiters.setdefault(user_id, set()).add(waiter)
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        with _lock:
+            waiters = _waiters.get(user_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del _waiters[user_id]
+
+
+def publish(user_ids):
+    """Wake every stream waiting for one of ``user_ids``."""
+    with _lock:
+        waiters = [waiter for user_id in set(user_ids) for waiter in _waiters.get(user_id, ())]
+    for loop, event in waiters:
+        loop.call_soon_threadsafe(event.set)
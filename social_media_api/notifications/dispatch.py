@@ -0,0 +1,265 @@
+"""
+Notification dispatch.
+
+Views call ``notify()`` instead of creating ``Notification`` rows themselves.
+How the row gets written is picked by ``NOTIFICATIONS_BACKEND``:
+
+``'sync'``
+    Written before ``notify()`` returns (the original behaviour).
+``'memory'``
+    Queued in-process once the surrounding transaction commits and written in
+    batches by a background thread. Queued notifications are lost if the
+    process dies.
+``'database'``
+    Appended to the ``PendingNotification`` queue table and moved into
+    ``Notification`` in batches by ``manage.py process_notifications``.
+
+Every backend ends up in ``deliver()``, which writes a batch with one
+``bulk_create``. When ``NOTIFICATIONS_COALESCE_WINDOW`` is set, notifications
+with the same recipient, verb and target are folded into the unread row
+created for them within that many seconds ("alice and 41 others liked your
+post"), keeping an actor count and the ``NOTIFICATIONS_COALESCE_SAMPLE_SIZE``
+most recent actors.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Notification, PendingNotification
+from . import broker
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_FIELDS = (
+    'recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id', 'timestamp',
+)
+
+
+def get_batch_size():
+    return getattr(settings, 'NOTIFICATIONS_BATCH_SIZE', 500)
+
+
+def build_payload(recipient, actor, verb, target):
+    return {
+        'recipient_id': recipient.pk,
+        'actor_id': actor.pk,
+        'verb': verb,
+        # Served from ContentType's in-process cache after the first lookup
+        'target_content_type_id': ContentType.objects.get_for_model(target).pk,
+        'target_object_id': target.pk,
+        'timestamp': timezone.now(),
+    }
+
+
+def get_coalesce_window():
+    return getattr(settings, 'NOTIFICATIONS_COALESCE_WINDOW', None)
+
+
+def get_sample_size():
+    return getattr(settings, 'NOTIFICATIONS_COALESCE_SAMPLE_SIZE', 3)
+
+
+def _group_key(payload):
+    return (
+        payload['recipient_id'], payload['verb'],
+        payload['target_content_type_id'], payload['target_object_id'],
+    )
+
+
+def _merge_actors(new_actor_ids, previous=()):
+    """Most recent actors first, without duplicates, cut to the sample size."""
+    merged = []
+    for actor_id in list(reversed(new_actor_ids)) + list(previous):
+        if actor_id not in merged:
+            merged.append(actor_id)
+    return merged[:get_sample_size()]
+
+
+def deliver(payloads):
+    """Write a batch of notification payloads."""
+    if not payloads:
+        return []
+    if get_coalesce_window():
+        notifications = _deliver_coalesced(payloads)
+    else:
+        notifications = Notification.objects.bulk_create(
+            [Notification(**payload, recent_actors=[payload['actor_id']]) for payload in payloads],
+            batch_size=get_batch_size(),
+        )
+    recipient_ids = {payload['recipient_id'] for payload in payloads}
+    # Wake any open notification streams once the rows are visible
+    transaction.on_commit(partial(broker.publish, recipient_ids))
+    return notifications
+
+
+def _deliver_coalesced(payloads):
+    # Fold the batch itself first: one group per (recipient, verb, target)
+    groups, latest = {}, {}
+    for payload in payloads:
+        key = _group_key(payload)
+        groups.setdefault(key, []).append(payload['actor_id'])
+        latest[key] = max(latest.get(key, payload['timestamp']), payload['timestamp'])
+
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = Notification.objects.select_for_update().filter(
+            is_read=False,
+            timestamp__gte=now - timedelta(seconds=get_coalesce_window()),
+            recipient_id__in={key[0] for key in groups},
+            verb__in={key[1] for key in groups},
+            target_object_id__in={key[3] for key in groups},
+        ).order_by('timestamp')
+        # Later rows overwrite earlier ones, so each key maps to its newest open row
+        open_rows = {
+            (row.recipient_id, row.verb, row.target_content_type_id, row.target_object_id): row
+            for row in candidates
+        }
+
+        updated, created = [], []
+        for key, actor_ids in groups.items():
+            row = open_rows.get(key)
+            if row is None:
+                recipient_id, verb, content_type_id, object_id = key
+                created.append(Notification(
+                    recipient_id=recipient_id,
+                    actor_id=actor_ids[-1],
+                    verb=verb,
+                    target_content_type_id=content_type_id,
+                    target_object_id=object_id,
+                    actor_count=len(actor_ids),
+                    recent_actors=_merge_actors(actor_ids),
+                    timestamp=latest[key],
+                    written_at=now,
+                ))
+            else:
+                row.actor_id = actor_ids[-1]
+                row.actor_count += len(actor_ids)
+                row.recent_actors = _merge_actors(actor_ids, row.recent_actors)
+                row.timestamp = max(row.timestamp, latest[key])
+                # Open streams send the row again with its new actors
+                row.written_at = now
+                updated.append(row)
+
+        Notification.objects.bulk_update(
+            updated, ['actor', 'actor_count', 'recent_actors', 'timestamp', 'written_at'],
+            batch_size=get_batch_size(),
+        )
+        return updated + Notification.objects.bulk_create(created, batch_size=get_batch_size())
+
+
+class SyncBackend:
+    def enqueue(self, payloads):
+        deliver(payloads)
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def enqueue(self, payloads):
+        self._ensure_worker()
+        # Don't notify about writes that end up rolled back
+        transaction.on_commit(partial(self._put_all, payloads))
+
+    def _put_all(self, payloads):
+        for payload in payloads:
+            self._queue.put(payload)
+
+    def drain(self, block=True):
+        """Deliver one batch of queued payloads and return how many there were."""
+        try:
+            payloads = [self._queue.get(block=block, timeout=1 if block else None)]
+        except queue.Empty:
+            return 0
+        while len(payloads) < get_batch_size():
+            try:
+                payloads.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            deliver(payloads)
+        except Exception:
+            # Queue the batch again so the next drain retries it
+            self._put_all(payloads)
+            raise
+        return len(payloads)
+
+    def flush(self):
+        while self.drain(block=False):
+            pass
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._worker.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            try:
+                self.drain()
+            except Exception:
+                # One failed batch must not stop delivery for the rest of the process
+                logger.exception('Delivering queued notifications failed')
+                time.sleep(1)
+            finally:
+                close_old_connections()
+
+
+class DatabaseBackend:
+    def enqueue(self, payloads):
+        PendingNotification.objects.bulk_create([PendingNotification(**payload) for payload in payloads])
+
+    def drain(self):
+        """Move one batch from the queue table into Notification and return its size."""
+        with transaction.atomic():
+            pending = PendingNotification.objects.order_by('pk')
+            if connection.features.has_select_for_update_skip_locked:
+                # Lets several workers drain the queue side by side
+                pending = pending.select_for_update(skip_locked=True)
+            batch = list(pending.values('pk', *PAYLOAD_FIELDS)[:get_batch_size()])
+            if not batch:
+                return 0
+            deliver([{field: row[field] for field in PAYLOAD_FIELDS} for row in batch])
+            PendingNotification.objects.filter(pk__in=[row['pk'] for row in batch]).delete()
+        return len(batch)
+
+    def flush(self):
+        while self.drain():
+            pass
+
+
+BACKENDS = {
+    'sync': SyncBackend,
+    'memory': MemoryBackend,
+    'database': DatabaseBackend,
+}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    name = getattr(settings, 'NOTIFICATIONS_BACKEND', 'sync')
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
+
+
+def notify(recipient, actor, verb, target):
+    """Queue a notification telling ``recipient`` that ``actor`` ``verb`` ``target``."""
+    get_backend().enqueue([build_payload(recipient, actor, verb, target)])
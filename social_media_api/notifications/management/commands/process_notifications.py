@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.dispatch import DatabaseBackend
+
+class Command(BaseCommand):
+    help = "Moves queued notifications (NOTIFICATIONS_BACKEND = 'database') into the notifications table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep draining the queue until interrupted')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty with --loop')
+
+    def handle(self, *args, **options):
+        backend = DatabaseBackend()
+        delivered = 0
+        while True:
+            batch = backend.drain()
+            delivered += batch
+            if batch:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Delivered {delivered} notifications.'))
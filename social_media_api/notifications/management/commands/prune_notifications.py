@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.retention import get_expired, get_retention_policy, prune_batch
+
+class Command(BaseCommand):
+    help = 'Archives or deletes notifications past the retention policy in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Notifications moved per transaction')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to ease load on the live table')
+        parser.add_argument('--delete', action='store_true',
+                            help='Delete expired notifications instead of archiving them')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many notifications have expired')
+
+    def handle(self, *args, **options):
+        policy = get_retention_policy()
+        if options['delete']:
+            policy['archive'] = False
+
+        if options['dry_run']:
+            self.stdout.write(f'{get_expired(policy).count()} notifications have expired.')
+            return
+
+        pruned = 0
+        while True:
+            batch = prune_batch(options['batch_size'], policy)
+            if not batch:
+                break
+            pruned += batch
+            time.sleep(options['sleep'])
+
+        verb = 'Archived' if policy['archive'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {pruned} notifications.'))
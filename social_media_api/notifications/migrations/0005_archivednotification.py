@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_id', models.BigIntegerField(unique=True)),
+                ('recipient_id', models.BigIntegerField(db_index=True)),
+                ('actor_id', models.BigIntegerField()),
+                ('verb', models.CharField(max_length=255)),
+                ('target_content_type_id', models.IntegerField()),
+                ('target_object_id', models.PositiveIntegerField()),
+                ('actor_count', models.PositiveIntegerField(default=1)),
+                ('was_read', models.BooleanField()),
+                ('timestamp', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
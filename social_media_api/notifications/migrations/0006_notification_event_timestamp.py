@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_archivednotification'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
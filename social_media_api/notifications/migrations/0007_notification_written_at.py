@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:20
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_timestamps(apps, schema_editor):
+    # Existing rows were written around their event time, not at migration time
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.update(written_at=F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0006_notification_event_timestamp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='written_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_timestamps, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'written_at', 'id'], name='notif_recipient_written'),
+        ),
+    ]
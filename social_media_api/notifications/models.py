@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth import get_user_model
@@ -16,10 +17,67 @@ class Notification(models.Model):
     target = GenericForeignKey('target_content_type', 'target_object_id')
     
     is_read = models.BooleanField(default=False)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # When the action happened; queued notifications are written later but keep this time
+    timestamp = models.DateTimeField(default=timezone.now)
+    # When this row was last inserted or coalesced into; notification streams resume from it
+    written_at = models.DateTimeField(default=timezone.now)
+
+    # Coalesced notifications fold repeated actions on the same target into one row;
+    # ``actor`` is then the most recent actor and ``recent_actors`` a sample of actor IDs
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # NotificationViewSet lists a recipient's notifications newest first
+            models.Index(fields=['recipient', '-timestamp'], name='notif_recipient_recent'),
+            # Unread filters, unread counts and coalescing only ever look at unread rows
+            models.Index(
+                fields=['recipient', '-timestamp'],
+                condition=models.Q(is_read=False),
+                name='notif_recipient_unread',
+            ),
+            # Notification streams scan a recipient's rows in write order
+            models.Index(fields=['recipient', 'written_at', 'id'], name='notif_recipient_written'),
+        ]
 
     def __str__(self):
+        if self.actor_count > 1:
+            return f'{self.actor} and {self.actor_count - 1} others {self.verb} {self.target}'
         return f'{self.actor} {self.verb} {self.target}'
+
+
+class PendingNotification(models.Model):
+    """A notification waiting in the durable dispatch queue; see notifications.dispatch."""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    verb = models.CharField(max_length=255)
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    target_object_id = models.PositiveIntegerField()
+    timestamp = models.DateTimeField()
+
+    def __str__(self):
+        return f'Pending: {self.actor_id} {self.verb} {self.target_object_id}'
+
+
+class ArchivedNotification(models.Model):
+    """
+    A notification moved out of the live table by ``prune_notifications``.
+
+    Plain ID columns instead of foreign keys keep the archive compact and free
+    of constraints on the user and content type tables.
+    """
+    notification_id = models.BigIntegerField(unique=True)
+    recipient_id = models.BigIntegerField(db_index=True)
+    actor_id = models.BigIntegerField()
+    verb = models.CharField(max_length=255)
+    target_content_type_id = models.IntegerField()
+    target_object_id = models.PositiveIntegerField()
+    actor_count = models.PositiveIntegerField(default=1)
+    was_read = models.BooleanField()
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Archived notification {self.notification_id}'
@@ -0,0 +1,67 @@
+"""
+Notification retention.
+
+Read notifications older than ``NOTIFICATIONS_RETENTION_READ_DAYS`` (and, if
+set, unread ones older than ``NOTIFICATIONS_RETENTION_UNREAD_DAYS``) expire.
+``prune_batch`` moves one small batch of expired rows into
+``ArchivedNotification``, or just deletes them, in its own short transaction,
+so pruning never holds locks on a large part of the live table.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+
+
+def get_retention_policy():
+    return {
+        'read_days': getattr(settings, 'NOTIFICATIONS_RETENTION_READ_DAYS', 30),
+        'unread_days': getattr(settings, 'NOTIFICATIONS_RETENTION_UNREAD_DAYS', None),
+        'archive': getattr(settings, 'NOTIFICATIONS_RETENTION_ARCHIVE', True),
+    }
+
+
+def get_expired(policy=None, now=None):
+    """Return a queryset of the notifications that have outlived the policy."""
+    policy = policy or get_retention_policy()
+    now = now or timezone.now()
+    condition = Q(pk__in=[])
+    if policy['read_days'] is not None:
+        condition |= Q(is_read=True, timestamp__lt=now - timedelta(days=policy['read_days']))
+    if policy['unread_days'] is not None:
+        condition |= Q(is_read=False, timestamp__lt=now - timedelta(days=policy['unread_days']))
+    return Notification.objects.filter(condition).order_by('pk')
+
+
+def prune_batch(batch_size, policy=None, now=None):
+    """Archive or delete one batch of expired notifications and return its size."""
+    policy = policy or get_retention_policy()
+    with transaction.atomic():
+        expired = get_expired(policy, now)
+        if connection.features.has_select_for_update_skip_locked:
+            # Skip rows a request is updating right now; the next run picks them up
+            expired = expired.select_for_update(skip_locked=True)
+        batch = list(expired[:batch_size])
+        if not batch:
+            return 0
+        if policy['archive']:
+            ArchivedNotification.objects.bulk_create([
+                ArchivedNotification(
+                    notification_id=notification.pk,
+                    recipient_id=notification.recipient_id,
+                    actor_id=notification.actor_id,
+                    verb=notification.verb,
+                    target_content_type_id=notification.target_content_type_id,
+                    target_object_id=notification.target_object_id,
+                    actor_count=notification.actor_count,
+                    was_read=notification.is_read,
+                    timestamp=notification.timestamp,
+                )
+                for notification in batch
+            ], ignore_conflicts=True)
+        Notification.objects.filter(pk__in=[notification.pk for notification in batch]).delete()
+    return len(batch)
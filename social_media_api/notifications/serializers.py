@@ -1,8 +1,60 @@
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
 from .models import Notification
 
+
+def load_targets(notifications):
+    """
+    Fetch the targets of many notifications with one ``in_bulk`` per content
+    type and return them keyed by ``(content_type_id, object_id)``.
+    """
+    ids_by_type = {}
+    for notification in notifications:
+        ids_by_type.setdefault(notification.target_content_type_id, set()).add(notification.target_object_id)
+    targets = {}
+    for content_type_id, object_ids in ids_by_type.items():
+        # get_for_id is served from ContentType's in-process cache
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        for object_id, target in model._base_manager.in_bulk(object_ids).items():
+            targets[(content_type_id, object_id)] = target
+    return targets
+
+
+def summarize_target(target):
+    if target is None:
+        return None
+    return {
+        'type': target._meta.label_lower,
+        'id': target.pk,
+        'label': str(target),
+    }
+
+
+class NotificationListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        notifications = list(data.all() if hasattr(data, 'all') else data)
+        # Resolve every target on the page up front instead of once per notification
+        self.targets = load_targets(notifications)
+        return super().to_representation(notifications)
+
+
 class NotificationSerializer(serializers.ModelSerializer):
+    target = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
-        fields = ['id', 'recipient', 'actor', 'verb', 'target', 'is_read', 'timestamp']
-        read_only_fields = ['recipient', 'actor', 'verb', 'target', 'timestamp']
+        list_serializer_class = NotificationListSerializer
+        fields = ['id', 'recipient', 'actor', 'verb', 'target', 'is_read', 'timestamp', 'actor_count', 'recent_actors']
+        read_only_fields = ['recipient', 'actor', 'verb', 'target', 'timestamp', 'actor_count', 'recent_actors']
+
+    def get_target(self, obj):
+        targets = getattr(self.parent, 'targets', None)
+        if targets is None:
+            return summarize_target(obj.target)
+        return summarize_target(targets.get((obj.target_content_type_id, obj.target_object_id)))
+
+class MarkAllReadSerializer(serializers.Serializer):
+    before = serializers.DateTimeField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
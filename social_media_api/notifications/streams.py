@@ -0,0 +1,183 @@
+"""
+Server-sent events stream of new notifications.
+
+``GET /api/notifications/stream/`` keeps one long-lived response per client
+and writes each new notification as an SSE ``message`` event. Coalesced
+notifications are sent again whenever they absorb a new actor, so clients
+should replace items by ``id``. The view is async, so it must be served by the
+ASGI application, where an idle connection costs a coroutine instead of a WSGI
+worker thread.
+
+Streams follow each row's ``written_at``. It is set before the writing
+transaction commits, so a row can become visible after rows written later.
+Every scan therefore starts ``NOTIFICATIONS_STREAM_OVERLAP`` seconds before
+the newest row sent so far and skips rows it has already sent. The event ID
+is the notification's ``(written_at, id)`` position. A client reconnecting
+with ``Last-Event-ID`` gets the rows of that overlap window again.
+
+``EventSource`` can't send an ``Authorization`` header, and a token in the
+query string would end up in access logs. Browsers instead
+``POST /api/notifications/stream/ticket/`` and open the stream with
+``?ticket=``. A ticket is signed, only opens streams and expires after
+``NOTIFICATIONS_STREAM_TICKET_MAX_AGE`` seconds.
+"""
+import json
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import broker
+from .models import Notification
+from .serializers import NotificationSerializer
+
+TICKET_SALT = 'notifications.stream'
+
+
+def get_poll_interval():
+    return getattr(settings, 'NOTIFICATIONS_STREAM_POLL_INTERVAL', 15)
+
+
+def get_overlap():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATIONS_STREAM_OVERLAP', 5))
+
+
+def get_ticket_max_age():
+    return getattr(settings, 'NOTIFICATIONS_STREAM_TICKET_MAX_AGE', 30)
+
+
+def issue_ticket(user):
+    """Sign a ticket that opens ``user``'s notification stream."""
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def read_ticket(ticket):
+    """Return the user ID of a valid, unexpired ticket, or None."""
+    try:
+        return int(signing.TimestampSigner(salt=TICKET_SALT).unsign(ticket, max_age=get_ticket_max_age()))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+async def authenticate(request):
+    """Accept a DRF token (``Authorization: Token <key>``), a stream ticket (``?ticket=``) or a session."""
+    header = request.headers.get('Authorization', '').split()
+    if len(header) == 2 and header[0].lower() == 'token':
+        token = await Token.objects.select_related('user').filter(key=header[1]).afirst()
+        if token is not None and token.user.is_active:
+            return token.user
+        return None
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = read_ticket(ticket)
+        if user_id is None:
+            return None
+        return await get_user_model().objects.filter(pk=user_id, is_active=True).afirst()
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def serialize(notifications):
+    return NotificationSerializer(notifications, many=True).data
+
+
+def encode_position(notification):
+    return f'{notification.written_at.isoformat()}/{notification.pk}'
+
+
+def decode_position(value):
+    written_at, pk = value.rsplit('/', 1)
+    return datetime.fromisoformat(written_at), int(pk)
+
+
+async def written_since(user, since):
+    """Return ``{id: written_at}`` of the user's notifications written since ``since``."""
+    return {
+        pk: written_at async for pk, written_at in
+        Notification.objects.filter(recipient=user, written_at__gte=since).values_list('pk', 'written_at')
+    }
+
+
+async def scan(user, since, batch_size):
+    """Yield the user's notifications written since ``since`` in write order, a batch at a time."""
+    position = (since, 0)
+    while True:
+        written_at, pk = position
+        notifications = [
+            notification async for notification in
+            Notification.objects.filter(
+                Q(written_at__gt=written_at) | Q(written_at=written_at, pk__gt=pk),
+                recipient=user,
+            ).order_by('written_at', 'pk')[:batch_size]
+        ]
+        if notifications:
+            yield notifications
+        if len(notifications) < batch_size:
+            return
+        position = (notifications[-1].written_at, notifications[-1].pk)
+
+
+async def event_stream(user, position, sent=None):
+    """
+    Stream the user's notifications written after ``position``.
+
+    ``sent`` maps the IDs of rows the client already has to their
+    ``written_at``, so those rows aren't sent again.
+    """
+    batch_size = getattr(settings, 'NOTIFICATIONS_STREAM_BATCH_SIZE', 50)
+    newest = position[0]
+    sent = dict(sent or {})
+    # Tell EventSource clients how long to wait before reconnecting
+    yield f'retry: {get_poll_interval() * 1000}\n\n'
+    while True:
+        since = newest - get_overlap()
+        sent = {pk: written_at for pk, written_at in sent.items() if written_at >= since}
+        found = False
+        async for notifications in scan(user, since, batch_size):
+            notifications = [
+                notification for notification in notifications
+                if sent.get(notification.pk) != notification.written_at
+            ]
+            if not notifications:
+                continue
+            found = True
+            for notification, data in zip(notifications, await sync_to_async(serialize)(notifications)):
+                sent[notification.pk] = notification.written_at
+                newest = max(newest, notification.written_at)
+                yield f'id: {encode_position(notification)}\ndata: {json.dumps(data, default=str)}\n\n'
+        if found:
+            continue
+        # Sleep until this process writes a notification for the user, or poll
+        # again after the interval to catch ones written by other processes
+        if not await broker.wait(user.pk, get_poll_interval()):
+            yield ': keep-alive\n\n'
+
+
+async def notification_stream(request):
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id:
+        try:
+            position = decode_position(last_event_id)
+        except ValueError:
+            return JsonResponse({'detail': 'Invalid Last-Event-ID.'}, status=400)
+        sent = {}
+    else:
+        # Fresh connections only receive notifications from now on
+        position = (timezone.now(), 0)
+        sent = await written_since(user, position[0] - get_overlap())
+
+    response = StreamingHttpResponse(event_stream(user, position, sent), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
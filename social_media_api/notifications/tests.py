@@ -0,0 +1,384 @@
+from datetime import timedelta
+from io import StringIO
+import asyncio
+import re
+import time
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APIClient
+from posts.models import Post
+from . import broker
+from .dispatch import MemoryBackend, build_payload, get_backend, notify
+from .streams import event_stream, read_ticket
+from .models import ArchivedNotification, Notification, PendingNotification
+from .views import NotificationViewSet
+
+User = get_user_model()
+
+class NotificationDispatchTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.fan = User.objects.create_user(username='fan', password='pass1234')
+        self.post = Post.objects.create(author=self.author, title='Test Post', content='Test Content')
+        self.client.force_authenticate(user=self.fan)
+
+    @override_settings(NOTIFICATIONS_BACKEND='database')
+    def test_database_backend_queues_until_processed(self):
+        """Test notifications wait in the durable queue until a worker drains it"""
+        self.client.post(reverse('post-like', args=[self.post.id]))
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(PendingNotification.objects.count(), 1)
+
+        call_command('process_notifications', stdout=StringIO())
+
+        self.assertFalse(PendingNotification.objects.exists())
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.author)
+        self.assertEqual(notification.actor, self.fan)
+        self.assertEqual(notification.target, self.post)
+
+    @override_settings(NOTIFICATIONS_BACKEND='memory')
+    def test_memory_backend_writes_after_commit(self):
+        """Test the in-process queue only receives notifications once the request commits"""
+        # Drain the queue from the test thread instead of the background worker
+        with mock.patch.object(MemoryBackend, '_ensure_worker'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('comment-list'), {'post': self.post.id, 'content': 'Nice!'})
+            self.assertFalse(Notification.objects.exists())
+            get_backend().flush()
+
+        self.assertTrue(
+            Notification.objects.filter(recipient=self.author, verb='commented on').exists()
+        )
+
+    @override_settings(NOTIFICATIONS_BACKEND='database')
+    def test_queued_notifications_keep_event_time(self):
+        """Test notifications delivered later are stamped with when the action happened"""
+        self.client.post(reverse('post-like', args=[self.post.id]))
+        event_time = PendingNotification.objects.get().timestamp - timedelta(minutes=5)
+        PendingNotification.objects.update(timestamp=event_time)
+
+        call_command('process_notifications', stdout=StringIO())
+
+        self.assertEqual(Notification.objects.get().timestamp, event_time)
+
+    def test_memory_backend_requeues_failed_batches(self):
+        """Test a batch that fails to deliver stays queued for the next drain"""
+        backend = MemoryBackend()
+        with mock.patch.object(MemoryBackend, '_ensure_worker'):
+            with self.captureOnCommitCallbacks(execute=True):
+                backend.enqueue([build_payload(self.author, self.fan, 'liked', self.post)])
+            with mock.patch('notifications.dispatch.deliver', side_effect=DatabaseError):
+                with self.assertRaises(DatabaseError):
+                    backend.drain(block=False)
+            backend.flush()
+
+        self.assertEqual(Notification.objects.count(), 1)
+
+@override_settings(NOTIFICATIONS_COALESCE_WINDOW=3600, NOTIFICATIONS_COALESCE_SAMPLE_SIZE=2)
+class NotificationCoalescingTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.post = Post.objects.create(author=self.author, title='Test Post', content='Test Content')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass1234') for i in range(3)]
+
+    def like_as(self, user):
+        self.client.force_authenticate(user=user)
+        self.client.post(reverse('post-like', args=[self.post.id]))
+
+    def test_likes_on_same_post_fold_into_one_notification(self):
+        """Test repeated likes within the window update one notification row"""
+        for fan in self.fans:
+            self.like_as(fan)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, self.fans[2])
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.recent_actors, [self.fans[2].id, self.fans[1].id])
+        self.assertEqual(str(notification), 'fan2 and 2 others liked Test Post')
+
+    def test_read_notifications_are_not_reopened(self):
+        """Test a like after the notification was read starts a new row"""
+        self.like_as(self.fans[0])
+        Notification.objects.update(is_read=True)
+        self.like_as(self.fans[1])
+
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(Notification.objects.get(is_read=False).actor_count, 1)
+
+class NotificationReadTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass1234')
+        self.other = User.objects.create_user(username='other', password='pass1234')
+        self.posts = [
+            Post.objects.create(author=self.user, title=f'Post {i}', content='...') for i in range(3)
+        ]
+        for post in self.posts:
+            notify(self.user, self.other, 'liked', post)
+        self.client.force_authenticate(user=self.user)
+
+    def test_mark_all_read_is_a_single_update(self):
+        """Test marking every notification read runs one UPDATE"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('notification-mark-all-read'))
+
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual([q['sql'].split()[0] for q in queries].count('UPDATE'), 1)
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+    def test_mark_all_read_filters(self):
+        """Test mark_all_read can be limited by IDs and by time"""
+        first, second, third = Notification.objects.order_by('pk')
+        Notification.objects.filter(pk=first.pk).update(timestamp=timezone.now() - timedelta(days=2))
+
+        response = self.client.post(
+            reverse('notification-mark-all-read'),
+            {'before': (timezone.now() - timedelta(days=1)).isoformat()},
+            format='json',
+        )
+        self.assertEqual(response.data['updated'], 1)
+
+        response = self.client.post(reverse('notification-mark-all-read'), {'ids': [third.pk]}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(list(Notification.objects.filter(is_read=False)), [second])
+
+    def test_unread_count_follows_creates_and_reads(self):
+        """Test the unread counter reflects new and read notifications immediately"""
+        url = reverse('notification-unread-count')
+        self.assertEqual(self.client.get(url).data['unread_count'], 3)
+
+        notify(self.user, self.other, 'commented on', self.posts[0])
+        self.assertEqual(self.client.get(url).data['unread_count'], 4)
+
+        self.client.post(reverse('notification-mark-all-read'))
+        self.assertEqual(self.client.get(url).data['unread_count'], 0)
+
+class NotificationSerializationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+
+    def add_notifications(self, count):
+        for i in range(count):
+            fan = User.objects.create_user(username=f'fan{User.objects.count()}', password='pass1234')
+            post = Post.objects.create(author=self.user, title=f'Post {i}', content='...')
+            notify(self.user, fan, 'liked', post)
+            notify(self.user, fan, 'started following', self.user)
+
+    def get_results(self):
+        data = self.client.get(reverse('notification-list')).data
+        # The list is only paginated when REST_FRAMEWORK sets a pagination class
+        return data['results'] if isinstance(data, dict) else data
+
+    def test_targets_are_rendered_as_typed_summaries(self):
+        """Test each notification carries a compact summary of its target"""
+        self.add_notifications(1)
+        targets = sorted((item['target'] for item in self.get_results()), key=lambda target: target['type'])
+
+        self.assertEqual(targets[0], {'type': 'accounts.customuser', 'id': self.user.id, 'label': 'user'})
+        self.assertEqual(targets[1]['type'], 'posts.post')
+        self.assertEqual(targets[1]['label'], 'Post 0')
+
+    def test_deleted_targets_render_as_null(self):
+        """Test notifications whose target is gone still serialize"""
+        self.add_notifications(1)
+        Post.objects.all().delete()
+        self.assertIn(None, [item['target'] for item in self.get_results()])
+
+    # Repeated follows would otherwise coalesce into fewer rows than were sent
+    @override_settings(NOTIFICATIONS_COALESCE_WINDOW=None)
+    def test_query_count_does_not_grow_with_page(self):
+        """Test a page of notifications costs a constant number of queries"""
+        self.add_notifications(1)
+        with CaptureQueriesContext(connection) as small_page:
+            self.assertEqual(len(self.get_results()), 2)
+        self.add_notifications(3)
+        with CaptureQueriesContext(connection) as large_page:
+            self.assertEqual(len(self.get_results()), 8)
+        self.assertEqual(len(small_page), len(large_page))
+
+class NotificationRetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass1234')
+        other = User.objects.create_user(username='other', password='pass1234')
+        posts = [Post.objects.create(author=self.user, title=f'Post {i}', content='...') for i in range(3)]
+        for post in posts:
+            notify(self.user, other, 'liked', post)
+        self.old_read, self.old_unread, self.recent_read = Notification.objects.order_by('pk')
+        old = timezone.now() - timedelta(days=31)
+        Notification.objects.filter(pk__in=[self.old_read.pk, self.old_unread.pk]).update(timestamp=old)
+        Notification.objects.filter(pk__in=[self.old_read.pk, self.recent_read.pk]).update(is_read=True)
+
+    def test_expired_read_notifications_are_archived(self):
+        """Test only read notifications past the retention period are moved to the archive"""
+        call_command('prune_notifications', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            set(Notification.objects.values_list('pk', flat=True)),
+            {self.old_unread.pk, self.recent_read.pk},
+        )
+        archived = ArchivedNotification.objects.get()
+        self.assertEqual(archived.notification_id, self.old_read.pk)
+        self.assertTrue(archived.was_read)
+
+    @override_settings(NOTIFICATIONS_RETENTION_UNREAD_DAYS=30)
+    def test_delete_mode_skips_the_archive(self):
+        """Test --delete removes expired notifications, read or unread, without archiving"""
+        call_command('prune_notifications', delete=True, stdout=StringIO())
+
+        self.assertEqual(list(Notification.objects.values_list('pk', flat=True)), [self.recent_read.pk])
+        self.assertFalse(ArchivedNotification.objects.exists())
+
+@override_settings(NOTIFICATIONS_STREAM_POLL_INTERVAL=0.5)
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass1234')
+        self.other = User.objects.create_user(username='other', password='pass1234')
+        self.post = Post.objects.create(author=self.user, title='Test Post', content='...')
+
+    async def test_stream_pushes_new_notifications(self):
+        """Test the stream emits notifications created after it was opened"""
+        stream = event_stream(self.user, (timezone.now(), 0))
+        self.assertTrue((await anext(stream)).startswith('retry:'))
+        self.assertEqual(await anext(stream), ': keep-alive\n\n')
+
+        next_event = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        await sync_to_async(notify)(self.user, self.other, 'liked', self.post)
+        broker.publish([self.user.pk])
+        event = await asyncio.wait_for(next_event, timeout=0.3)
+
+        notification = await Notification.objects.aget()
+        self.assertIn(f'/{notification.pk}\n', event)
+        self.assertIn('"verb": "liked"', event)
+        await stream.aclose()
+
+    async def test_stream_sends_rows_committed_late(self):
+        """Test a row written before the newest sent one but committed after it is still sent once"""
+        stream = event_stream(self.user, (timezone.now(), 0))
+        await anext(stream)
+        first = await sync_to_async(Notification.objects.create)(
+            recipient=self.user, actor=self.other, verb='liked', target=self.post,
+        )
+        self.assertIn(f'/{first.pk}\n', await asyncio.wait_for(anext(stream), timeout=1))
+
+        # Written a second before the row above, but only visible now
+        late = await sync_to_async(Notification.objects.create)(
+            recipient=self.user, actor=self.other, verb='commented', target=self.post,
+            written_at=first.written_at - timedelta(seconds=1),
+        )
+        self.assertIn(f'/{late.pk}\n', await asyncio.wait_for(anext(stream), timeout=1))
+        self.assertEqual(await asyncio.wait_for(anext(stream), timeout=1), ': keep-alive\n\n')
+        await stream.aclose()
+
+    async def test_stream_requires_authentication(self):
+        """Test anonymous, bad-ticket and token-in-URL clients are rejected"""
+        response = await self.async_client.get(reverse('notification-stream'))
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(reverse('notification-stream'), {'ticket': 'nope'})
+        self.assertEqual(response.status_code, 401)
+        token = await Token.objects.acreate(user=self.user)
+        response = await self.async_client.get(reverse('notification-stream'), {'token': token.key})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_ticket_opens_stream(self):
+        """Test a ticket from the ticket endpoint opens the stream of the user it was issued to"""
+        token = await Token.objects.acreate(user=self.user)
+        client = APIClient(headers={'Authorization': f'Token {token.key}'})
+        response = await sync_to_async(client.post)(reverse('notification-stream-ticket'))
+        ticket = response.data['ticket']
+        self.assertNotIn(token.key, ticket)
+        self.assertEqual(read_ticket(ticket), self.user.pk)
+
+        response = await self.async_client.get(reverse('notification-stream'), {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        await response.streaming_content.aclose()
+
+    def test_stream_tickets_expire(self):
+        """Test tickets stop working after NOTIFICATIONS_STREAM_TICKET_MAX_AGE and can't be forged"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ticket = client.post(reverse('notification-stream-ticket')).data['ticket']
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 31):
+            self.assertIsNone(read_ticket(ticket))
+        self.assertIsNone(read_ticket(ticket.replace(str(self.user.pk), str(self.other.pk), 1)))
+
+    async def test_stream_accepts_token(self):
+        """Test a DRF token opens an event stream"""
+        token = await Token.objects.acreate(user=self.user)
+        response = await self.async_client.get(
+            reverse('notification-stream'), headers={'Authorization': f'Token {token.key}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        await response.streaming_content.aclose()
+
+class NotificationQueryPlanTests(TestCase):
+    """EXPLAIN the notification queries and fail if they stop using an index."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass1234')
+        other = User.objects.create_user(username='other', password='pass1234')
+        post = Post.objects.create(author=self.user, title='Test Post', content='...')
+        for _ in range(5):
+            notify(self.user, other, 'liked', post)
+            notify(other, self.user, 'liked', post)
+
+    def get_viewset_queryset(self):
+        view = NotificationViewSet()
+        view.request = RequestFactory().get('/')
+        view.request.user = self.user
+        return view.get_queryset()
+
+    def assertIndexedPlan(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables make a sequential scan cheapest, so only check an index *can* serve it
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn('Seq Scan', plan, plan)
+            self.assertIsNone(re.search(r'(^|->)\s*Sort\b', plan, re.MULTILINE), plan)
+        elif connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            self.assertIsNone(re.search(r'\bSCAN notifications_notification\b', plan), plan)
+            self.assertNotIn('USE TEMP B-TREE', plan, plan)
+        else:
+            self.skipTest(f'No plan assertions for {connection.vendor}')
+
+    def test_list_uses_recipient_index(self):
+        """Test the notification list is an index range scan without a sort"""
+        self.assertIndexedPlan(self.get_viewset_queryset())
+
+    def test_unread_list_uses_index(self):
+        """Test the unread filter is served by an index without a sort"""
+        self.assertIndexedPlan(self.get_viewset_queryset().filter(is_read=False))
+
+    def test_unread_count_uses_index(self):
+        """Test counting unread notifications is served by an index"""
+        self.assertIndexedPlan(self.get_viewset_queryset().filter(is_read=False).order_by())
+
+    def test_stream_scan_uses_index(self):
+        """Test the stream's write-order scan is served by an index without a sort"""
+        since = timezone.now() - timedelta(seconds=5)
+        self.assertIndexedPlan(
+            Notification.objects.filter(
+                Q(written_at__gt=since) | Q(written_at=since, pk__gt=0), recipient=self.user,
+            ).order_by('written_at', 'pk')[:50]
+        )
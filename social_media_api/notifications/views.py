@@ -3,7 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, MarkAllReadSerializer
+from .streams import get_ticket_max_age, issue_ticket
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
@@ -16,5 +17,29 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def mark_as_read(self, request, pk=None):
         notification = self.get_object()
         notification.is_read = True
-        notification.save()
+        notification.save(update_fields=['is_read'])
         return Response({'status': 'notification marked as read'})
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        serializer = MarkAllReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # A single UPDATE, optionally limited to older notifications or given IDs
+        notifications = self.get_queryset().filter(is_read=False)
+        if 'before' in serializer.validated_data:
+            notifications = notifications.filter(timestamp__lte=serializer.validated_data['before'])
+        if 'ids' in serializer.validated_data:
+            notifications = notifications.filter(pk__in=serializer.validated_data['ids'])
+        updated = notifications.update(is_read=True)
+        return Response({'status': 'notifications marked as read', 'updated': updated})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        # Counted from the partial unread index, so it is always current and stays cheap
+        unread = self.get_queryset().filter(is_read=False).order_by().count()
+        return Response({'unread_count': unread})
+
+    @action(detail=False, methods=['post'], url_path='stream/ticket', url_name='stream-ticket')
+    def stream_ticket(self, request):
+        # EventSource can't send headers; a short-lived ticket keeps API tokens out of stream URLs
+        return Response({'ticket': issue_ticket(request.user), 'expires_in': get_ticket_max_age()})
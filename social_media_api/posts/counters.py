@@ -0,0 +1,115 @@
+"""
+Like counters.
+
+Likes are counted on ``Post.like_count`` with atomic ``F()`` updates. Once a
+post receives more than ``LIKE_SHARDING_RATE_THRESHOLD`` likes within
+``LIKE_SHARDING_RATE_WINDOW`` seconds it switches to sharded mode: further
+writes go to one of ``LIKE_COUNTER_SHARDS`` random ``LikeCounterShard`` rows,
+so concurrent likes no longer queue up on the same row lock. Reads of a
+sharded post sum its slots and cache the total for a few seconds.
+
+List endpoints use ``annotate_like_stats`` instead, which computes the totals
+(and whether the requesting user liked each post) in the page query itself.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Like, LikeCounterShard, Post
+
+
+def get_shard_count():
+    return getattr(settings, 'LIKE_COUNTER_SHARDS', 16)
+
+
+def get_rate_threshold():
+    return getattr(settings, 'LIKE_SHARDING_RATE_THRESHOLD', 100)
+
+
+def get_rate_window():
+    return getattr(settings, 'LIKE_SHARDING_RATE_WINDOW', 60)
+
+
+def get_shard_cache_timeout():
+    return getattr(settings, 'LIKE_SHARD_CACHE_TIMEOUT', 5)
+
+
+def _shard_total_key(post_id):
+    return f'posts:like_shards:{post_id}'
+
+
+def change_like_count(post, delta):
+    """Apply ``delta`` to the like counter of ``post``."""
+    if post.like_count_sharded:
+        slot = random.randrange(get_shard_count())
+        LikeCounterShard.objects.filter(post=post, slot=slot).update(count=F('count') + delta)
+        return
+
+    posts = Post.objects.filter(pk=post.pk)
+    if delta < 0:
+        # Never drive a drifted counter below zero; reconcile_like_counts fixes drift
+        posts = posts.filter(like_count__gte=-delta)
+    posts.update(like_count=F('like_count') + delta)
+    if delta > 0 and _record_like_rate(post.pk, delta) > get_rate_threshold():
+        enable_sharding(post)
+
+
+def _record_like_rate(post_id, delta):
+    """Count likes on a post in the current rate window and return the running total."""
+    window = get_rate_window()
+    key = f'posts:like_rate:{post_id}:{int(time.time() // window)}'
+    cache.add(key, 0, window * 2)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The key expired between add() and incr()
+        return delta
+
+
+def enable_sharding(post):
+    """Switch a post to sharded counting, creating its slots."""
+    with transaction.atomic():
+        LikeCounterShard.objects.bulk_create(
+            [LikeCounterShard(post=post, slot=slot) for slot in range(get_shard_count())],
+            ignore_conflicts=True,
+        )
+        Post.objects.filter(pk=post.pk).update(like_count_sharded=True)
+    post.like_count_sharded = True
+
+
+def get_like_count(post):
+    """Return the number of likes on ``post``."""
+    if not post.like_count_sharded:
+        return post.like_count
+    key = _shard_total_key(post.pk)
+    shard_total = cache.get(key)
+    if shard_total is None:
+        shard_total = LikeCounterShard.objects.filter(post=post).aggregate(total=Sum('count'))['total'] or 0
+        cache.set(key, shard_total, get_shard_cache_timeout())
+    return post.like_count + shard_total
+
+
+def annotate_like_stats(queryset, user):
+    """
+    Annotate posts with ``likes_total`` and ``liked_by_me`` for ``user``, so a
+    page of posts costs the same number of queries whatever its size.
+    """
+    shard_totals = (
+        LikeCounterShard.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(total=Sum('count')).values('total')
+    )
+    queryset = queryset.annotate(likes_total=Case(
+        When(like_count_sharded=True, then=F('like_count') + Coalesce(Subquery(shard_totals), 0)),
+        default=F('like_count'),
+        output_field=IntegerField(),
+    ))
+    if user.is_authenticated:
+        liked_by_me = Exists(Like.objects.filter(post=OuterRef('pk'), user=user))
+    else:
+        liked_by_me = Value(False)
+    return queryset.annotate(liked_by_me=liked_by_me)
@@ -0,0 +1,219 @@
+"""
+Write-behind buffering for likes.
+
+With ``LIKES_WRITE_BEHIND`` enabled, ``PostViewSet.like`` and ``unlike`` only
+record the user's intent and answer ``202 Accepted``. Intents collect either
+in an in-process buffer (``LIKES_BUFFER_BACKEND = 'memory'``), drained every
+``LIKES_FLUSH_INTERVAL`` seconds by a daemon thread, or in the
+``PendingLike`` queue table (``'database'``), drained by the
+``flush_like_buffer`` command. A flush collapses repeated intents for the same
+user and post and applies the rest with one ``bulk_create(ignore_conflicts=True)``
+and batched deletes. A batch that fails to apply stays queued and is retried
+by the next flush. Each intent carries the time it was recorded, which the
+flush uses as the like notification's timestamp.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from notifications.dispatch import deliver
+from .counters import change_like_count
+from .models import Like, PendingLike, Post
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+LIKE = 'like'
+UNLIKE = 'unlike'
+
+
+def is_enabled():
+    return getattr(settings, 'LIKES_WRITE_BEHIND', False)
+
+
+def get_flush_batch_size():
+    return getattr(settings, 'LIKES_FLUSH_BATCH_SIZE', 1000)
+
+
+class MemoryLikeBuffer:
+    """Per-process buffer, flushed by a background thread."""
+
+    def __init__(self):
+        self._intents = deque()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def push(self, intent):
+        self._intents.append(intent)
+        self._ensure_flusher()
+
+    def drain(self, max_items):
+        intents = []
+        while len(intents) < max_items:
+            try:
+                intents.append(self._intents.popleft())
+            except IndexError:
+                break
+        return intents
+
+    def flush_batch(self, max_items):
+        """Apply one batch of intents and return its size."""
+        intents = self.drain(max_items)
+        if intents:
+            try:
+                apply_intents(intents)
+            except Exception:
+                # Back in front of newer intents, so the retry keeps their order
+                self._intents.extendleft(reversed(intents))
+                raise
+        return len(intents)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name='like-buffer-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(flush)
+
+    def _run(self):
+        interval = getattr(settings, 'LIKES_FLUSH_INTERVAL', 1.0)
+        while True:
+            time.sleep(interval)
+            try:
+                flush()
+            except Exception:
+                # The failed batch is queued again; keep the thread alive to retry it
+                logger.exception('Flushing buffered likes failed')
+            finally:
+                close_old_connections()
+
+
+class DatabaseLikeBuffer:
+    """Queue table shared by all processes, flushed by ``flush_like_buffer``."""
+
+    def push(self, intent):
+        action, user_id, post_id, created_at = intent
+        PendingLike.objects.create(action=action, user_id=user_id, post_id=post_id, created_at=created_at)
+
+    def flush_batch(self, max_items):
+        """Claim, apply and delete one batch of queued intents and return its size."""
+        with transaction.atomic():
+            # Concurrent flushers wait on these row locks and take turns, so no
+            # intent is applied twice and a user's intents stay in order
+            pending = PendingLike.objects.select_for_update().order_by('pk')
+            batch = list(pending.values_list('pk', 'action', 'user_id', 'post_id', 'created_at')[:max_items])
+            if not batch:
+                return 0
+            apply_intents([intent for _, *intent in batch])
+            # Applied and dequeued together: a failure rolls both back
+            PendingLike.objects.filter(pk__in=[pk for pk, *_ in batch]).delete()
+        return len(batch)
+
+
+BACKENDS = {
+    'memory': MemoryLikeBuffer,
+    'database': DatabaseLikeBuffer,
+}
+_buffers = {}
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    backend = getattr(settings, 'LIKES_BUFFER_BACKEND', 'memory')
+    with _buffer_lock:
+        if backend not in _buffers:
+            _buffers[backend] = BACKENDS[backend]()
+        return _buffers[backend]
+
+
+def enqueue(action, user_id, post_id):
+    """Record a like or unlike intent to be applied by the next flush."""
+    get_buffer().push((action, user_id, post_id, timezone.now()))
+
+
+def flush():
+    """Apply every buffered intent and return how many intents were applied."""
+    buffer = get_buffer()
+    applied = 0
+    while True:
+        count = buffer.flush_batch(get_flush_batch_size())
+        if not count:
+            return applied
+        applied += count
+
+
+def apply_intents(intents):
+    """Write a batch of like/unlike intents; the last intent per user and post wins."""
+    final = {}
+    liked_at = {}
+    for action, user_id, post_id, created_at in intents:
+        final[(user_id, post_id)] = action
+        liked_at[(user_id, post_id)] = created_at
+
+    posts = Post.objects.only('id', 'author_id', 'like_count_sharded').in_bulk(
+        {post_id for _, post_id in final}
+    )
+    # Posts and users deleted since the intent was recorded have nothing left to like
+    users = set(User.objects.filter(pk__in={user_id for user_id, _ in final}).values_list('pk', flat=True))
+    final = {pair: action for pair, action in final.items() if pair[1] in posts and pair[0] in users}
+    if not final:
+        return
+
+    with transaction.atomic():
+        existing = set(
+            Like.objects.filter(
+                user_id__in={user_id for user_id, _ in final},
+                post_id__in={post_id for _, post_id in final},
+            ).values_list('user_id', 'post_id')
+        )
+        to_create = [pair for pair, action in final.items() if action == LIKE and pair not in existing]
+        to_delete = [pair for pair, action in final.items() if action == UNLIKE and pair in existing]
+
+        Like.objects.bulk_create(
+            [Like(user_id=user_id, post_id=post_id) for user_id, post_id in to_create],
+            ignore_conflicts=True,
+        )
+        if to_delete:
+            users_by_post = {}
+            for user_id, post_id in to_delete:
+                users_by_post.setdefault(post_id, []).append(user_id)
+            condition = Q()
+            for post_id, user_ids in users_by_post.items():
+                condition |= Q(post_id=post_id, user_id__in=user_ids)
+            Like.objects.filter(condition).delete()
+
+        deltas = {}
+        for _, post_id in to_create:
+            deltas[post_id] = deltas.get(post_id, 0) + 1
+        for _, post_id in to_delete:
+            deltas[post_id] = deltas.get(post_id, 0) - 1
+        for post_id, delta in deltas.items():
+            if delta:
+                change_like_count(posts[post_id], delta)
+
+        # Already off the request path, so write the notifications straight away
+        post_type_id = ContentType.objects.get_for_model(Post).pk
+        deliver([
+            {
+                'recipient_id': posts[post_id].author_id,
+                'actor_id': user_id,
+                'verb': 'liked',
+                'target_content_type_id': post_type_id,
+                'target_object_id': post_id,
+                # When the user liked the post, not when the buffer was flushed
+                'timestamp': liked_at[(user_id, post_id)],
+            }
+            for user_id, post_id in to_create
+            if posts[post_id].author_id != user_id
+        ])
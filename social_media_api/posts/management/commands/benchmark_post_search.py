@@ -0,0 +1,75 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework import filters
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from posts.models import Post
+from posts.search import FullTextSearchFilter, is_supported
+
+User = get_user_model()
+
+WORDS = (
+    'django python search index query timeline follow post like comment cache shard '
+    'feed graph vector ranking token network server client latency stream notify'
+).split()
+
+class SearchView:
+    search_fields = ['title', 'content']
+    # Paginated like PostViewSet, so the filter leaves the typo fallback to the view
+    paginator = PageNumberPagination()
+
+class Command(BaseCommand):
+    help = "Compares PostViewSet's full-text search backend with DRF's SearchFilter"
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', default=['python', 'search index', 'timeline cache'],
+                            help='Search strings to time')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Times each query is run')
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Insert this many random posts for the run and roll them back afterwards')
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError('This database has no full-text search index.')
+        with transaction.atomic():
+            if options['synthetic']:
+                self.create_posts(options['synthetic'])
+            self.stdout.write(f'Searching {Post.objects.count()} posts')
+            for query in options['queries']:
+                request = Request(APIRequestFactory().get('/', {'search': query}))
+                like_ms, like_hits = self.time(filters.SearchFilter(), request, options['repeat'])
+                fts_ms, fts_hits = self.time(FullTextSearchFilter(), request, options['repeat'])
+                self.stdout.write(self.style.SUCCESS(
+                    f'{query!r}: SearchFilter {like_ms:.2f} ms ({like_hits} hits), '
+                    f'full-text {fts_ms:.2f} ms ({fts_hits} hits)'
+                ))
+            transaction.set_rollback(True)
+
+    def create_posts(self, count):
+        rng = random.Random(0)
+        author, _ = User.objects.get_or_create(username='search-benchmark')
+        Post.objects.bulk_create(
+            [
+                Post(
+                    author=author,
+                    title=' '.join(rng.choices(WORDS, k=5)),
+                    content=' '.join(rng.choices(WORDS, k=60)),
+                )
+                for _ in range(count)
+            ],
+            batch_size=1000,
+        )
+
+    def time(self, backend, request, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            # Fetch a first page, which is what the endpoint serves
+            hits = list(backend.filter_queryset(request, Post.objects.all(), SearchView())[:10])
+        return (time.perf_counter() - started) * 1000 / repeat, len(hits)
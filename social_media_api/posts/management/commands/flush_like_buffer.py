@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from posts import like_buffer
+
+class Command(BaseCommand):
+    help = 'Applies buffered like/unlike intents (LIKES_WRITE_BEHIND) to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep flushing until interrupted')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait between flushes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            applied = like_buffer.flush()
+            if applied or not options['loop']:
+                self.stdout.write(f'Applied {applied} like intents.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
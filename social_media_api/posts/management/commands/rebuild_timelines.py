@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from posts.timeline import rebuild_timeline
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Rebuilds materialized home timelines from the follow graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild the timeline of this user ID (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of users loaded per query')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['user_ids']:
+            users = users.filter(pk__in=options['user_ids'])
+
+        rebuilt = 0
+        for user in users.iterator(chunk_size=options['chunk_size']):
+            rebuild_timeline(user)
+            rebuilt += 1
+            if rebuilt % options['chunk_size'] == 0:
+                self.stdout.write(f'Rebuilt {rebuilt} timelines...')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} timelines.'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from posts.models import LikeCounterShard, Post
+
+class Command(BaseCommand):
+    help = 'Recomputes post like counters from Like rows and fixes any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of posts checked per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted counters without fixing them')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        shard_totals = (
+            LikeCounterShard.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post').annotate(total=Sum('count')).values('total')
+        )
+        last_pk = 0
+        checked = fixed = 0
+
+        while True:
+            with transaction.atomic():
+                # Walk the table in primary key order so each chunk is a cheap range scan
+                chunk = list(
+                    Post.objects.filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .annotate(actual=Count('likes'), shard_total=Coalesce(Subquery(shard_totals), 0))
+                    .only('pk', 'like_count')[:chunk_size]
+                )
+                if not chunk:
+                    break
+                drifted = [post for post in chunk if post.like_count + post.shard_total != post.actual]
+                for post in drifted:
+                    post.like_count = post.actual
+                if drifted and not options['dry_run']:
+                    Post.objects.bulk_update(drifted, ['like_count'])
+                    # Fold sharded counters back into the base count
+                    LikeCounterShard.objects.filter(post__in=drifted).update(count=0)
+
+            checked += len(chunk)
+            fixed += len(drifted)
+            last_pk = chunk[-1].pk
+
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} posts. {verb} {fixed} drifted like counts.'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_like_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    likes = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(total=Count('pk')).values('total')
+    Post.objects.update(like_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_author_recent_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_like_count, migrations.RunPython.noop),
+    ]
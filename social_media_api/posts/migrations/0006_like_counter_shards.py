@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_like_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count_sharded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='LikeCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_shards', to='posts.post')),
+            ],
+            options={
+                'unique_together': {('post', 'slot')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from posts.trigrams import trigrams
+
+
+def build_title_trigrams(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # pg_trgm indexes the column directly
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute('CREATE INDEX posts_post_title_trgm ON posts_post USING GIN (title gin_trgm_ops)')
+        return
+    Post = apps.get_model('posts', 'Post')
+    PostTitleTrigram = apps.get_model('posts', 'PostTitleTrigram')
+    rows = []
+    for pk, value in Post.objects.values_list('pk', 'title').iterator():
+        grams = trigrams(value)
+        rows.extend(PostTitleTrigram(post_id=pk, trigram=gram, total=len(grams)) for gram in grams)
+    PostTitleTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+def drop_title_trigrams(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS posts_post_title_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTitleTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('total', models.PositiveSmallIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='title_trigrams', to='posts.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'post'], name='posts_title_trigram_lookup')],
+                'unique_together': {('post', 'trigram')},
+            },
+        ),
+        migrations.RunPython(build_title_trigrams, drop_title_trigrams),
+    ]
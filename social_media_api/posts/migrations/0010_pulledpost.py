@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_pulled_posts(apps, schema_editor):
+    # Posts of authors over the threshold were never fanned out; keep pulling them
+    Post = apps.get_model('posts', 'Post')
+    PulledPost = apps.get_model('posts', 'PulledPost')
+    threshold = getattr(settings, 'FEED_FANOUT_FOLLOWER_THRESHOLD', 10000)
+    posts = Post.objects.filter(author__followers_count__gte=threshold).values_list('id', 'author_id', 'created_at')
+    PulledPost.objects.bulk_create(
+        [PulledPost(post_id=post_id, author_id=author_id, created_at=created_at) for post_id, author_id, created_at in posts.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_follow_counts'),
+        ('posts', '0009_pendinglike'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PulledPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pulled', serialize=False, to='posts.post')),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['author', '-created_at', '-post'], name='posts_pulled_author_recent')],
+            },
+        ),
+        migrations.RunPython(record_pulled_posts, migrations.RunPython.noop),
+    ]
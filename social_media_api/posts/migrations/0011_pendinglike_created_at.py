@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_pulledpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendinglike',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
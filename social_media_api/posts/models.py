@@ -20,10 +20,43 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized number of likes, kept in step with Like rows using F() updates
+    like_count = models.PositiveIntegerField(default=0)
+    # Hot posts spread like writes over LikeCounterShard rows; see posts.counters
+    like_count_sharded = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Read-time pulls of a high-follower author's recent posts
+            models.Index(fields=['author', '-created_at', '-id'], name='posts_post_author_recent'),
+        ]
 
     def __str__(self):
         return self.title
 
+class LikeCounterShard(models.Model):
+    """One slot of a sharded like counter; a post's likes are like_count plus all of its slots."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='like_shards')
+    slot = models.PositiveSmallIntegerField()
+    # Unlikes land on a random slot too, so a single slot may go negative
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'slot')
+
+    def __str__(self):
+        return f'Like shard {self.slot} of {self.post}'
+
+class PendingLike(models.Model):
+    """A like or unlike waiting in the write-behind queue table; see posts.like_buffer."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    action = models.CharField(max_length=6, choices=[('like', 'Like'), ('unlike', 'Unlike')])
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'Pending {self.action} of {self.post_id} by {self.user_id}'
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
@@ -33,3 +66,53 @@ class Comment(models.Model):
 
     def __str__(self):
         return f'Comment by {self.author} on {self.post}'
+
+
+class TimelineEntry(models.Model):
+    """A post materialized into the home timeline of one of its author's followers."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # Copied from the post so the feed can be read straight off the index
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='posts_timeline_user_recent'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} in timeline of {self.user}'
+
+
+class PulledPost(models.Model):
+    """A post that was not fanned out because its author was over the follower threshold; see posts.timeline."""
+    post = models.OneToOneField(Post, primary_key=True, on_delete=models.CASCADE, related_name='pulled')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # Copied from the post so an author's pulled posts are read straight off the index
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['author', '-created_at', '-post'], name='posts_pulled_author_recent'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} pulled at read time'
+
+
+class PostTitleTrigram(models.Model):
+    """One trigram of a post title, for fuzzy title search where pg_trgm is unavailable (see posts.trigrams)."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='title_trigrams')
+    trigram = models.CharField(max_length=3)
+    # Number of trigrams in the whole title, needed to score similarity
+    total = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('post', 'trigram')
+        indexes = [
+            models.Index(fields=['trigram', 'post'], name='posts_title_trigram_lookup'),
+        ]
+
+    def __str__(self):
+        return f'{self.trigram!r} in {self.post}'
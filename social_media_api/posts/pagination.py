@@ -0,0 +1,108 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+# Largest value a 64-bit ID column holds
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_id(value):
+    """Return a cursor's ID as an int, rejecting values no ID column can hold."""
+    pk = int(value)
+    if not -MAX_ID <= pk <= MAX_ID:
+        raise OverflowError(f'ID out of range: {pk}')
+    return pk
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor pagination over ``(created_at, id)``, newest first.
+
+    Each page is a range scan that starts right after the last row of the
+    previous page, so it never issues a ``COUNT(*)`` and rows created between
+    requests can't shift items across page boundaries.
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    # Attributes of the paginated objects that make up the position
+    ordering_fields = ('created_at', 'id')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Return the ``(created_at, id)`` position encoded in the request, if any."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return datetime.fromisoformat(created_at), parse_id(pk)
+        # OverflowError: Infinity or an ID too large for the database
+        except (TypeError, ValueError, OverflowError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj):
+        created_field, pk_field = self.ordering_fields
+        position = [getattr(obj, created_field).isoformat(), getattr(obj, pk_field)]
+        return base64.urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+
+    def get_position_filter(self, position):
+        created_field, pk_field = self.ordering_fields
+        created_at, pk = position
+        return Q(**{f'{created_field}__lt': created_at}) | Q(
+            **{created_field: created_at, f'{pk_field}__lt': pk}
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+        queryset = queryset.order_by(*(f'-{field}' for field in self.ordering_fields))
+        # Fetch one extra row to find out whether there is a next page
+        return self.paginate_rows(list(queryset[:self.get_page_size(request) + 1]), request)
+
+    def paginate_rows(self, rows, request):
+        """Paginate rows that were already fetched after the request's cursor."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
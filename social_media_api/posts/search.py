@@ -0,0 +1,99 @@
+"""
+Full-text search over posts.
+
+Migration ``0007_post_search_index`` maintains the index outside the models.
+On SQLite it is the FTS5 table ``posts_post_fts``, which triggers keep in
+sync with ``posts_post``. On Postgres it is the generated ``search_vector``
+column with a GIN index. ``search_posts`` filters a post queryset through
+whichever index exists and annotates a ``search_rank``. Title matches
+weigh more than content matches.
+
+SQLite drops the triggers whenever Django rebuilds ``posts_post`` to alter
+it. A migration that changes the table on SQLite must re-run the forward
+SQL of ``0007_post_search_index``.
+
+When nothing matches, ``FullTextSearchFilter`` falls back to fuzzy matching
+on titles (``post_titles``), so misspelled searches still find posts.
+Paginated views only try the fallback once the ranked page is empty.
+"""
+import re
+from functools import partial
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Post, PostTitleTrigram
+from .trigrams import TrigramIndex
+
+# bm25() weights for the title and content columns
+SQLITE_COLUMN_WEIGHTS = (10.0, 1.0)
+
+
+post_titles = TrigramIndex(Post, 'title', PostTitleTrigram, 'post')
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _fts5_query(terms):
+    # Quote every term so user input can't inject FTS5 query syntax
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def search_posts(queryset, query):
+    """Return the posts in ``queryset`` matching every word of ``query``, best match first."""
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(terms)
+        # The FTS5 table isn't a model, so filter on its rowids and rank with a
+        # correlated subquery; bm25() is lower for better matches, so negate it
+        # to rank like Postgres
+        queryset = queryset.filter(
+            pk__in=RawSQL('SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s', [match]),
+        ).annotate(search_rank=RawSQL(
+            'SELECT -bm25(posts_post_fts, %s, %s) FROM posts_post_fts '
+            'WHERE posts_post_fts MATCH %s AND posts_post_fts.rowid = posts_post.id',
+            [*SQLITE_COLUMN_WEIGHTS, match],
+            output_field=FloatField(),
+        ))
+    else:
+        text = ' '.join(terms)
+        queryset = queryset.filter(RawSQL(
+            "posts_post.search_vector @@ plainto_tsquery('english', %s)", [text], output_field=BooleanField(),
+        )).annotate(search_rank=RawSQL(
+            "ts_rank_cd(posts_post.search_vector, plainto_tsquery('english', %s))", [text],
+            output_field=FloatField(),
+        ))
+    return queryset.order_by('-search_rank', '-created_at', '-id')
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ``SearchFilter`` replacement answered from the full-text index, with
+    results ranked by relevance. On databases without an index it falls back
+    to ``SearchFilter`` over the view's ``search_fields``.
+
+    Paginated views get the fuzzy title search as ``view.search_fallback``
+    and call it only when the ranked page comes back empty, so a search that
+    matches costs no extra query.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_supported():
+            return super().filter_queryset(request, queryset, view)
+        query = request.query_params.get(self.search_param, '')
+        results = search_posts(queryset, query)
+        if not query.strip():
+            return results
+        # Probably a typo when nothing matches; look for titles that are spelled similarly
+        fallback = partial(post_titles.search, query, queryset)
+        if getattr(view, 'paginator', None) is not None:
+            view.search_fallback = fallback
+            return results
+        # Unpaginated views fetch every hit anyway, so checking for one costs no extra query
+        return results or fallback()
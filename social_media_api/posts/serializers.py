@@ -1,16 +1,29 @@
 from rest_framework import serializers
 from .models import Post, Comment, Like
+from .counters import get_like_count
 
 class PostSerializer(serializers.ModelSerializer):
     likes_count = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
     author = serializers.StringRelatedField(read_only=True)
     class Meta:
         model = Post
-        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at', 'likes_count']
-        read_only_fields = ['author', 'created_at', 'updated_at', 'likes_count']
-        
+        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at', 'likes_count', 'liked_by_me']
+        read_only_fields = ['author', 'created_at', 'updated_at', 'likes_count', 'liked_by_me']
+
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        # Querysets annotated with annotate_like_stats already carry the total
+        if hasattr(obj, 'likes_total'):
+            return obj.likes_total
+        return get_like_count(obj)
+
+    def get_liked_by_me(self, obj):
+        if hasattr(obj, 'liked_by_me'):
+            return obj.liked_by_me
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return False
+        return obj.likes.filter(user=request.user).exists()
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from .models import Post, TimelineEntry
+from .search import post_titles
+from . import timeline
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=User.followers.through)
+def sync_timelines_with_follow_graph(sender, instance, action, reverse, pk_set, **kwargs):
+    # Forward: ``author.followers.add(...)``; reverse: ``follower.following.add(...)``
+    if action == 'post_add':
+        if reverse:
+            timeline.backfill_timelines([instance.pk], pk_set)
+        else:
+            timeline.backfill_timelines(pk_set, [instance.pk])
+    elif action == 'post_remove':
+        if reverse:
+            timeline.remove_from_timelines([instance.pk], pk_set)
+        else:
+            timeline.remove_from_timelines(pk_set, [instance.pk])
+    elif action == 'post_clear':
+        if reverse:
+            TimelineEntry.objects.filter(user=instance).delete()
+        else:
+            TimelineEntry.objects.filter(post__author=instance).delete()
+
+
+@receiver(post_save, sender=Post)
+def index_post_title(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is None or 'title' in update_fields:
+        post_titles.index([instance])
@@ -1,15 +1,30 @@
-from django.test import TestCase
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from posts.models import Post, Like
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from posts import like_buffer
+from posts.models import Post, Like, LikeCounterShard, PendingLike, PostTitleTrigram, TimelineEntry
+from posts.search import search_posts
+from posts.upserts import insert_if_absent
 from notifications.models import Notification
 
 User = get_user_model()
 
 class LikeTests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         # Create users
         self.user1 = User.objects.create_user(username='user1', password='pass1234')
@@ -62,6 +77,238 @@ class LikeTests(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_like_and_unlike_update_like_count(self):
+        """Test the denormalized like counter follows likes and unlikes"""
+        self.client.post(reverse('post-like', args=[self.post.id]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        response = self.client.get(reverse('post-detail', args=[self.post.id]))
+        self.assertEqual(response.data['likes_count'], 1)
+
+        self.client.post(reverse('post-unlike', args=[self.post.id]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_reconcile_like_counts(self):
+        """Test the reconciliation command fixes drifted counters"""
+        Like.objects.create(user=self.user1, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(like_count=7)
+
+        call_command('reconcile_like_counts', chunk_size=1, stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    @override_settings(LIKE_SHARDING_RATE_THRESHOLD=2, LIKE_COUNTER_SHARDS=4)
+    def test_hot_post_switches_to_sharded_counter(self):
+        """Test a post crossing the like rate threshold counts likes on shards"""
+        for i in range(5):
+            fan = User.objects.create_user(username=f'fan{i}', password='pass1234')
+            self.client.force_authenticate(user=fan)
+            self.client.post(reverse('post-like', args=[self.post.id]))
+        self.client.post(reverse('post-unlike', args=[self.post.id]))
+
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.like_count_sharded)
+        self.assertEqual(LikeCounterShard.objects.filter(post=self.post).count(), 4)
+        response = self.client.get(reverse('post-detail', args=[self.post.id]))
+        self.assertEqual(response.data['likes_count'], 4)
+
+        # Reconciliation folds the shards back into the base counter
+        Like.objects.filter(post=self.post).first().delete()
+        call_command('reconcile_like_counts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 3)
+        self.assertFalse(LikeCounterShard.objects.filter(post=self.post).exclude(count=0).exists())
+
+# Needs a test database that several threads can open at once
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentLikeTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='fan', password='pass1234')
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.post = Post.objects.create(author=self.author, title='Hot', content='Content')
+
+    def like(self, _):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        try:
+            return client.post(reverse('post-like', args=[self.post.id])).status_code
+        finally:
+            connections.close_all()
+
+    def test_concurrent_likes_create_one_row(self):
+        """Test simultaneous likes from one user insert exactly one like without errors"""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            codes = list(pool.map(self.like, range(32)))
+        self.assertEqual(codes.count(status.HTTP_200_OK), 1)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), 31)
+        self.assertEqual(Like.objects.filter(user=self.user, post=self.post).count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.author, verb='liked').count(), 1)
+
+class RepeatedLikeTests(APITestCase):
+    """The race ConcurrentLikeTests covers, serialized on one connection so it also runs on SQLite."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='fan', password='pass1234')
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.post = Post.objects.create(author=self.author, title='Hot', content='Content')
+
+    def test_insert_if_absent_reports_the_first_insert_only(self):
+        """Test repeated upserts of one row insert it once and report True only the first time"""
+        results = [insert_if_absent(Like, user=self.user, post=self.post) for _ in range(5)]
+        self.assertEqual(results, [True, False, False, False, False])
+        self.assertEqual(Like.objects.filter(user=self.user, post=self.post).count(), 1)
+
+    def test_repeated_likes_create_one_row(self):
+        """Test repeated likes insert one like, count it once and notify once"""
+        self.client.force_authenticate(user=self.user)
+        codes = [self.client.post(reverse('post-like', args=[self.post.id])).status_code for _ in range(5)]
+        self.assertEqual(codes, [status.HTTP_200_OK] + [status.HTTP_400_BAD_REQUEST] * 4)
+        self.assertEqual(Like.objects.filter(user=self.user, post=self.post).count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.author, verb='liked').count(), 1)
+
+class PostListQueryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.reader = User.objects.create_user(username='reader', password='pass1234')
+        self.author.followers.add(self.reader)
+        self.client.force_authenticate(user=self.reader)
+
+    def create_posts(self, count):
+        posts = [Post.objects.create(author=self.author, title=f'Post {i}', content='...') for i in range(count)]
+        # Re-following backfills the new posts into the reader's timeline
+        self.author.followers.remove(self.reader)
+        self.author.followers.add(self.reader)
+        return posts
+
+    def get_results(self, url):
+        data = self.client.get(url).data
+        # The post list is only paginated when REST_FRAMEWORK sets a pagination class
+        return data['results'] if isinstance(data, dict) else data
+
+    def test_list_exposes_liked_by_me(self):
+        """Test post lists report likes_count and liked_by_me per post"""
+        liked, other = self.create_posts(2)
+        self.client.post(reverse('post-like', args=[liked.id]))
+
+        for url in (reverse('post-list'), reverse('feed')):
+            results = {post['id']: post for post in self.get_results(url)}
+            self.assertTrue(results[liked.id]['liked_by_me'])
+            self.assertEqual(results[liked.id]['likes_count'], 1)
+            self.assertFalse(results[other.id]['liked_by_me'])
+            self.assertEqual(results[other.id]['likes_count'], 0)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        """Test a page of posts costs a constant number of queries"""
+        for url in (reverse('post-list'), reverse('feed')):
+            Post.objects.all().delete()
+            self.create_posts(2)
+            # Load the per-process pull-author cache outside the measured requests
+            self.get_results(url)
+            with CaptureQueriesContext(connection) as small_page:
+                self.assertEqual(len(self.get_results(url)), 2)
+            self.create_posts(6)
+            with CaptureQueriesContext(connection) as large_page:
+                self.assertEqual(len(self.get_results(url)), 8)
+            self.assertEqual(len(small_page), len(large_page))
+
+@override_settings(LIKES_WRITE_BEHIND=True, LIKES_BUFFER_BACKEND='database')
+class WriteBehindLikeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.fan = User.objects.create_user(username='fan', password='pass1234')
+        self.post = Post.objects.create(author=self.author, title='Test Post', content='Test Content')
+        self.client.force_authenticate(user=self.fan)
+
+    def test_like_is_acknowledged_then_flushed(self):
+        """Test buffered likes are written, counted and notified on flush"""
+        response = self.client.post(reverse('post-like', args=[self.post.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Like.objects.exists())
+
+        call_command('flush_like_buffer', stdout=StringIO())
+
+        self.assertTrue(Like.objects.filter(user=self.fan, post=self.post).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(Notification.objects.filter(recipient=self.author, verb='liked').exists())
+
+    def test_notification_keeps_the_time_of_the_like(self):
+        """Test a flushed like is notified at the time it was liked, not flushed"""
+        liked_at = timezone.now() - timedelta(minutes=5)
+        with mock.patch('posts.like_buffer.timezone.now', return_value=liked_at):
+            self.client.post(reverse('post-like', args=[self.post.id]))
+
+        call_command('flush_like_buffer', stdout=StringIO())
+
+        self.assertEqual(Notification.objects.get(recipient=self.author, verb='liked').timestamp, liked_at)
+
+    def test_flush_collapses_repeated_intents(self):
+        """Test the last intent per user and post wins"""
+        for action in ('post-like', 'post-unlike', 'post-like', 'post-like'):
+            self.client.post(reverse(action, args=[self.post.id]))
+
+        call_command('flush_like_buffer', stdout=StringIO())
+
+        self.assertEqual(Like.objects.count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        self.client.post(reverse('post-unlike', args=[self.post.id]))
+        call_command('flush_like_buffer', stdout=StringIO())
+
+        self.assertFalse(Like.objects.exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_unknown_posts_are_not_queued(self):
+        """Test likes of missing posts return 404 instead of being buffered"""
+        self.assertEqual(self.client.post(reverse('post-like', args=[999999])).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(PendingLike.objects.exists())
+
+    def test_failed_batches_stay_queued(self):
+        """Test a batch that fails to apply is retried by the next flush"""
+        self.client.post(reverse('post-like', args=[self.post.id]))
+        with mock.patch('posts.like_buffer.apply_intents', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                like_buffer.flush()
+        self.assertEqual(PendingLike.objects.count(), 1)
+
+        self.assertEqual(like_buffer.flush(), 1)
+        self.assertTrue(Like.objects.filter(user=self.fan, post=self.post).exists())
+        self.assertFalse(PendingLike.objects.exists())
+
+    @override_settings(LIKES_BUFFER_BACKEND='memory')
+    def test_memory_buffer_requeues_failed_batches(self):
+        """Test the in-process buffer puts a failed batch back in order"""
+        buffer = like_buffer.MemoryLikeBuffer()
+        buffer._flusher = object()  # no background thread in tests
+        now = timezone.now()
+        buffer.push((like_buffer.LIKE, self.fan.pk, self.post.pk, now))
+        buffer.push((like_buffer.UNLIKE, self.fan.pk, self.post.pk, now))
+        with mock.patch('posts.like_buffer.apply_intents', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                buffer.flush_batch(1)
+        buffer.push((like_buffer.LIKE, self.fan.pk, self.post.pk, now))
+        self.assertEqual(buffer.drain(10), [
+            (like_buffer.LIKE, self.fan.pk, self.post.pk, now),
+            (like_buffer.UNLIKE, self.fan.pk, self.post.pk, now),
+            (like_buffer.LIKE, self.fan.pk, self.post.pk, now),
+        ])
+
 class NotificationTests(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -101,3 +348,228 @@ class NotificationTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         notification.refresh_from_db()
         self.assertTrue(notification.is_read)
+
+class FeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.reader = User.objects.create_user(username='reader', password='pass1234')
+        self.author.followers.add(self.reader)
+        self.client.force_authenticate(user=self.reader)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Test creating a post pushes it into follower timelines"""
+        self.client.force_authenticate(user=self.author)
+        response = self.client.post(reverse('post-list'), {'title': 'Hello', 'content': 'World'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post_id=response.data['id']).exists()
+        )
+
+    def test_feed_reads_timeline_newest_first(self):
+        """Test the feed returns timeline posts newest first"""
+        first = Post.objects.create(author=self.author, title='First', content='...')
+        second = Post.objects.create(author=self.author, title='Second', content='...')
+        self.author.followers.remove(self.reader)
+        self.author.followers.add(self.reader)  # backfills the existing posts
+
+        response = self.client.get(reverse('feed'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['id'] for post in response.data['results']], [second.id, first.id])
+
+    def test_unfollow_removes_posts_from_timeline(self):
+        """Test unfollowing an author drops their posts from the timeline"""
+        Post.objects.create(author=self.author, title='Post', content='...')
+        self.author.followers.add(self.reader)
+        self.author.followers.remove(self.reader)
+
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(FEED_TIMELINE_DEPTH=2)
+    def test_timeline_is_trimmed_to_depth(self):
+        """Test timelines never grow past FEED_TIMELINE_DEPTH"""
+        self.client.force_authenticate(user=self.author)
+        for i in range(4):
+            self.client.post(reverse('post-list'), {'title': f'Post {i}', 'content': '...'})
+
+        titles = TimelineEntry.objects.filter(user=self.reader).order_by('-created_at', '-post_id')
+        self.assertEqual([entry.post.title for entry in titles], ['Post 3', 'Post 2'])
+
+    @override_settings(FEED_TIMELINE_DEPTH=1)
+    def test_fan_out_trims_more_than_a_thousand_timelines(self):
+        """Test a post fanned out to over a thousand full timelines trims every one of them"""
+        followers = User.objects.bulk_create([User(username=f'follower{i}') for i in range(1100)])
+        # Follow rows written directly, so the follow signals don't backfill anything
+        User.followers.through.objects.bulk_create([
+            User.followers.through(from_customuser=self.author, to_customuser=follower) for follower in followers
+        ])
+        self.client.force_authenticate(user=self.author)
+        for i in range(2):
+            response = self.client.post(reverse('post-list'), {'title': f'Post {i}', 'content': '...'})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(TimelineEntry.objects.filter(user__in=followers).count(), len(followers))
+        self.assertFalse(TimelineEntry.objects.filter(user__in=followers, post__title='Post 0').exists())
+
+    @override_settings(FEED_TIMELINE_DEPTH=1)
+    def test_backfill_trims_more_than_a_thousand_timelines(self):
+        """Test following an author with over a thousand users at once backfills and trims every timeline"""
+        followers = User.objects.bulk_create([User(username=f'follower{i}') for i in range(1100)])
+        # Fill every timeline with an older post from someone else
+        older = Post.objects.create(author=self.reader, title='Older', content='...')
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user=follower, post=older, created_at=older.created_at) for follower in followers
+        ])
+        Post.objects.create(author=self.author, title='Newer', content='...')
+        self.author.followers.add(*followers)
+
+        entries = TimelineEntry.objects.filter(user__in=followers)
+        self.assertEqual(entries.count(), len(followers))
+        self.assertEqual(set(entries.values_list('post__title', flat=True)), {'Newer'})
+
+    def test_feed_cursor_pagination(self):
+        """Test walking the feed page by page with the opaque cursor"""
+        self.client.force_authenticate(user=self.author)
+        for i in range(5):
+            self.client.post(reverse('post-list'), {'title': f'Post {i}', 'content': '...'})
+        self.client.force_authenticate(user=self.reader)
+
+        first_page = self.client.get(reverse('feed'), {'page_size': 2})
+        self.assertNotIn('count', first_page.data)
+        self.assertEqual([post['title'] for post in first_page.data['results']], ['Post 4', 'Post 3'])
+
+        # A post created between requests must not shift the following pages
+        self.client.force_authenticate(user=self.author)
+        self.client.post(reverse('post-list'), {'title': 'Late post', 'content': '...'})
+        self.client.force_authenticate(user=self.reader)
+
+        second_page = self.client.get(first_page.data['next'])
+        self.assertEqual([post['title'] for post in second_page.data['results']], ['Post 2', 'Post 1'])
+        last_page = self.client.get(second_page.data['next'])
+        self.assertEqual([post['title'] for post in last_page.data['results']], ['Post 0'])
+        self.assertIsNone(last_page.data['next'])
+
+    def test_feed_rejects_invalid_cursor(self):
+        """Test a malformed cursor returns 404"""
+        response = self.client.get(reverse('feed'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # Infinity and IDs no database column can hold are rejected too
+        now = timezone.now().isoformat()
+        for position in ([now, float('inf')], [now, 1e300], [now, 10 ** 30]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+            response = self.client.get(reverse('feed'), {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+    @override_settings(FEED_FANOUT_FOLLOWER_THRESHOLD=2)
+    def test_high_follower_authors_are_pulled_at_read_time(self):
+        """Test posts by authors over the fan-out threshold are merged in at read time"""
+        celebrity = User.objects.create_user(username='celebrity', password='pass1234')
+        fan = User.objects.create_user(username='fan', password='pass1234')
+        celebrity.followers.add(self.reader, fan)
+        cache.clear()
+
+        older = Post.objects.create(author=self.author, title='Pushed', content='...')
+        self.client.force_authenticate(user=celebrity)
+        self.client.post(reverse('post-list'), {'title': 'Pulled', 'content': '...'})
+        self.client.force_authenticate(user=self.author)
+        self.client.post(reverse('post-list'), {'title': 'Newest', 'content': '...'})
+        self.author.followers.remove(self.reader)
+        self.author.followers.add(self.reader)
+
+        self.assertFalse(TimelineEntry.objects.filter(post__author=celebrity).exists())
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(
+            [post['title'] for post in response.data['results']],
+            ['Newest', 'Pulled', older.title],
+        )
+
+    @override_settings(FEED_FANOUT_FOLLOWER_THRESHOLD=2)
+    def test_posts_from_the_pull_period_stay_in_feeds(self):
+        """Test posts made while over the threshold are still read after the author drops below it"""
+        celebrity = User.objects.create_user(username='celebrity', password='pass1234')
+        fan = User.objects.create_user(username='fan', password='pass1234')
+        celebrity.followers.add(self.reader, fan)
+        cache.clear()
+        self.client.force_authenticate(user=celebrity)
+        self.client.post(reverse('post-list'), {'title': 'Pulled', 'content': '...'})
+
+        celebrity.followers.remove(fan)
+        cache.clear()
+        self.client.post(reverse('post-list'), {'title': 'Pushed', 'content': '...'})
+        celebrity.followers.add(fan)
+
+        for user in (self.reader, fan):
+            self.client.force_authenticate(user=user)
+            response = self.client.get(reverse('feed'))
+            self.assertEqual([post['title'] for post in response.data['results']], ['Pushed', 'Pulled'])
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='pass1234')
+        self.in_title = Post.objects.create(author=self.author, title='Caching timelines', content='Notes on feeds.')
+        self.in_content = Post.objects.create(author=self.author, title='Weekly notes', content='We started caching the feed.')
+        self.unrelated = Post.objects.create(author=self.author, title='Holiday', content='Pictures from the beach.')
+
+    def search(self, query):
+        response = self.client.get(reverse('post-list'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        return [post['title'] for post in results]
+
+    def test_search_is_ranked(self):
+        """Test matches are returned with title hits ranked above content hits"""
+        self.assertEqual(self.search('caching'), ['Caching timelines', 'Weekly notes'])
+        # Stemming matches other forms of the word, and every term must match
+        self.assertEqual(self.search('cached feeds'), ['Caching timelines', 'Weekly notes'])
+        self.assertFalse(search_posts(Post.objects.all(), 'caching beach').exists())
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test the index stays in sync when posts are edited or deleted"""
+        self.unrelated.content = 'Caching the beach photos.'
+        self.unrelated.save()
+        self.in_title.delete()
+        self.assertEqual(sorted(self.search('caching')), ['Holiday', 'Weekly notes'])
+
+    def test_query_syntax_is_escaped(self):
+        """Test search operators in user input are treated as plain words"""
+        self.assertEqual(self.search('"caching" -( *'), ['Caching timelines', 'Weekly notes'])
+        self.assertFalse(search_posts(Post.objects.all(), 'caching OR beach').exists())
+        self.assertEqual(len(self.search('')), 3)
+
+    def test_misspelled_search_falls_back_to_trigrams(self):
+        """Test a search with no full-text hits returns titles spelled similarly"""
+        self.assertEqual(self.search('cachng timelnes'), ['Caching timelines'])
+        self.assertEqual(self.search('holliday'), ['Holiday'])
+        self.assertEqual(self.search('zzqx'), [])
+
+    def test_matching_search_skips_the_fallback(self):
+        """Test a search with ranked hits runs no existence check and no trigram lookup"""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search('caching'), ['Caching timelines', 'Weekly notes'])
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn(PostTitleTrigram._meta.db_table, sql)
+        self.assertNotIn('LIMIT 1', sql)
+
+    def test_title_trigrams_follow_edits(self):
+        """Test renamed posts are found under their new title only"""
+        self.unrelated.title = 'Mountains'
+        self.unrelated.save()
+        self.assertEqual(self.search('mountians'), ['Mountains'])
+        self.assertEqual(self.search('holliday'), [])
+
+    @override_settings(TRIGRAM_SIMILARITY_THRESHOLD=0.9)
+    def test_similarity_threshold_is_configurable(self):
+        """Test a stricter threshold rejects looser matches"""
+        self.assertEqual(self.search('holliday'), [])
+
+    def test_benchmark_command(self):
+        """Test the benchmark command runs and rolls back its synthetic posts"""
+        out = StringIO()
+        call_command('benchmark_post_search', 'python', '--repeat', '1', '--synthetic', '50', stdout=out)
+        self.assertIn('full-text', out.getvalue())
+        self.assertEqual(Post.objects.count(), 3)
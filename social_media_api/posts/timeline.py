@@ -0,0 +1,194 @@
+"""
+Materialized home timelines.
+
+Every post is pushed into the timeline of each of its author's followers when
+it is created (fan-out-on-write), so reading a feed is a single range scan over
+the ``posts_timeline_user_recent`` index instead of a join over the follow
+graph. Timelines are trimmed to ``FEED_TIMELINE_DEPTH`` entries.
+
+Authors with at least ``FEED_FANOUT_FOLLOWER_THRESHOLD`` followers are not
+pushed, since a single post would write one row per follower. Their posts are
+recorded as ``PulledPost`` rows instead, pulled at read time and merged into
+the precomputed timeline. They stay pulled after the author drops back below
+the threshold, so nothing posted in the meantime disappears from feeds.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Post, PulledPost, TimelineEntry
+
+User = get_user_model()
+
+
+def get_timeline_depth():
+    return getattr(settings, 'FEED_TIMELINE_DEPTH', 800)
+
+
+def get_batch_size():
+    return getattr(settings, 'FEED_FANOUT_BATCH_SIZE', 1000)
+
+
+def get_fanout_threshold():
+    return getattr(settings, 'FEED_FANOUT_FOLLOWER_THRESHOLD', 10000)
+
+
+PULL_AUTHORS_CACHE_KEY = 'feed:pull_author_ids'
+
+
+def get_pull_authors_cache_timeout():
+    return getattr(settings, 'FEED_PULL_AUTHORS_CACHE_TIMEOUT', 300)
+
+
+def _pull_author_sets():
+    # Computed together so an author whose new post is pulled is also read back
+    sets = cache.get(PULL_AUTHORS_CACHE_KEY)
+    if sets is None:
+        pushing_off = frozenset(
+            User.objects.filter(followers_count__gte=get_fanout_threshold()).values_list('id', flat=True)
+        )
+        with_pulled_posts = frozenset(PulledPost.objects.order_by().values_list('author_id', flat=True).distinct())
+        sets = (pushing_off, pushing_off | with_pulled_posts)
+        cache.set(PULL_AUTHORS_CACHE_KEY, sets, get_pull_authors_cache_timeout())
+    return sets
+
+
+def get_pull_author_ids():
+    """Return the IDs of authors whose new posts are pulled at read time instead of pushed."""
+    return _pull_author_sets()[0]
+
+
+def get_pulled_author_ids():
+    """Return the IDs of authors with posts to pull at read time, including former pull authors."""
+    return _pull_author_sets()[1]
+
+
+def _batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def fan_out_post(post):
+    """Push a freshly created post into the timelines of its author's followers."""
+    if post.author_id in get_pull_author_ids():
+        PulledPost.objects.create(post=post, author_id=post.author_id, created_at=post.created_at)
+        return
+    follower_ids = list(post.author.followers.values_list('id', flat=True))
+    for batch in _batched(follower_ids, get_batch_size()):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post=post, created_at=post.created_at) for user_id in batch],
+            ignore_conflicts=True,
+        )
+        trim_timelines(batch)
+
+
+def trim_timelines(user_ids):
+    """Drop everything past ``FEED_TIMELINE_DEPTH`` from the given users' timelines."""
+    # One DELETE of the entries ranked past the limit in each timeline, however
+    # many users there are (a condition per user overflows SQLite's expression depth)
+    overflow = (
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=[F('user_id')],
+            order_by=[F('created_at').desc(), F('post_id').desc()],
+        ))
+        .filter(position__gt=get_timeline_depth())
+        .values('pk')
+    )
+    TimelineEntry.objects.filter(pk__in=overflow).delete()
+
+
+def backfill_timelines(user_ids, author_ids):
+    """Copy the recent posts of ``author_ids`` into the timelines of ``user_ids``."""
+    posts = []
+    for author_id in set(author_ids):
+        # Pulled posts are merged in at read time
+        posts.extend(
+            Post.objects.filter(author_id=author_id, pulled__isnull=True)
+            .order_by('-created_at', '-id')
+            .values_list('id', 'created_at')[:get_timeline_depth()]
+        )
+    if not posts:
+        return
+    entries = [
+        TimelineEntry(user_id=user_id, post_id=post_id, created_at=created_at)
+        for user_id in user_ids
+        for post_id, created_at in posts
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=get_batch_size(), ignore_conflicts=True)
+    for batch in _batched(list(user_ids), get_batch_size()):
+        trim_timelines(batch)
+
+
+def remove_from_timelines(user_ids, author_ids):
+    """Remove the posts of ``author_ids`` from the timelines of ``user_ids``."""
+    TimelineEntry.objects.filter(user_id__in=user_ids, post__author_id__in=author_ids).delete()
+
+
+def rebuild_timeline(user):
+    """Recompute a user's timeline from scratch off the follow graph."""
+    posts = (
+        Post.objects.filter(author__in=user.following.all(), pulled__isnull=True)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:get_timeline_depth()]
+    )
+    TimelineEntry.objects.filter(user=user).delete()
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=post_id, created_at=created_at) for post_id, created_at in posts],
+        batch_size=get_batch_size(),
+    )
+
+
+def _position_filter(before, created_field, pk_field):
+    created_at, pk = before
+    return Q(**{f'{created_field}__lt': created_at}) | Q(
+        **{created_field: created_at, f'{pk_field}__lt': pk}
+    )
+
+
+def read_timeline(user, before=None, limit=None, queryset=None):
+    """
+    Return the newest posts in a user's timeline, newest first.
+
+    ``before`` is an optional ``(created_at, post_id)`` position; only posts
+    strictly older than it are returned. ``queryset`` lets callers add
+    annotations to the posts that are read.
+    """
+    if queryset is None:
+        queryset = Post.objects.select_related('author')
+    # Keep every timeline condition in one filter() so they share a single join
+    condition = Q(timeline_entries__user=user)
+    if before is not None:
+        condition &= _position_filter(before, 'timeline_entries__created_at', 'timeline_entries__post')
+    posts = queryset.filter(condition).order_by('-timeline_entries__created_at', '-timeline_entries__post')
+    return list(posts[:limit or get_timeline_depth()])
+
+
+def read_feed(user, before=None, limit=None, queryset=None):
+    """
+    Return a user's feed, newest first: the pushed timeline k-way merged with
+    the recent pulled posts of the followed authors.
+    """
+    if queryset is None:
+        queryset = Post.objects.select_related('author')
+    limit = limit or get_timeline_depth()
+    streams = [read_timeline(user, before=before, limit=limit, queryset=queryset)]
+    pulled_ids = user.following.filter(pk__in=get_pulled_author_ids()).values_list('id', flat=True)
+    for author_id in pulled_ids:
+        posts = queryset.filter(pulled__author_id=author_id)
+        if before is not None:
+            posts = posts.filter(_position_filter(before, 'pulled__created_at', 'pulled__post'))
+        streams.append(list(posts.order_by('-pulled__created_at', '-pulled__post')[:limit]))
+    if len(streams) == 1:
+        return streams[0]
+
+    merged = heapq.merge(*streams, key=lambda post: (post.created_at, post.id), reverse=True)
+    seen = set()
+    unique = (post for post in merged if not (post.id in seen or seen.add(post.id)))
+    return list(islice(unique, limit))
@@ -0,0 +1,127 @@
+"""
+Typo-tolerant lookups by trigram similarity.
+
+A string's trigrams are the three-character windows of its lowercased words,
+each padded with two spaces in front and one behind, the same way pg_trgm
+builds them. Two strings are similar when they share a large fraction of
+their trigrams. The fraction is ``shared / (a + b - shared)``, and a match
+must reach ``TRIGRAM_SIMILARITY_THRESHOLD``.
+
+On Postgres the ``%`` operator answers this from a GIN ``gin_trgm_ops``
+index. On other databases a ``TrigramIndex`` keeps one row per (object,
+trigram) in its own table, so a lookup only reads the rows for the query's
+trigrams.
+"""
+import math
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections, router
+from django.db.models import BooleanField, Case, Count, F, FloatField, Max, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+# pg_trgm.similarity_threshold unless the server is configured otherwise
+PG_TRGM_DEFAULT_THRESHOLD = 0.3
+
+
+def get_similarity_threshold():
+    return getattr(settings, 'TRIGRAM_SIMILARITY_THRESHOLD', 0.3)
+
+
+def get_candidate_limit():
+    return getattr(settings, 'TRIGRAM_CANDIDATE_LIMIT', 100)
+
+
+def trigrams(text):
+    """Return the set of pg_trgm-style trigrams of ``text``."""
+    found = set()
+    for word in re.findall(r'[^\W_]+', (text or '').lower()):
+        padded = f'  {word} '
+        found.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return found
+
+
+class TrigramIndex:
+    """
+    Fuzzy lookups on ``model.field``.
+
+    ``table`` is the model holding the trigram rows. It has a foreign key
+    named ``object_field`` to ``model``, a ``trigram`` column and a
+    ``total`` column, which is the number of trigrams of the indexed string.
+    """
+
+    def __init__(self, model, field, table, object_field):
+        self.model = model
+        self.field = field
+        self.table = table
+        self.object_field = object_field
+
+    def uses_pg_trgm(self):
+        return connections[router.db_for_write(self.model)].vendor == 'postgresql'
+
+    def index(self, objs):
+        """Rebuild the trigram rows of ``objs``; Postgres indexes the column itself."""
+        if self.uses_pg_trgm():
+            return
+        objs = list(objs)
+        self.table.objects.filter(**{f'{self.object_field}__in': objs}).delete()
+        rows = []
+        for obj in objs:
+            grams = trigrams(getattr(obj, self.field))
+            rows.extend(
+                self.table(**{self.object_field: obj, 'trigram': gram, 'total': len(grams)})
+                for gram in grams
+            )
+        self.table.objects.bulk_create(rows, batch_size=1000)
+
+    def search(self, query, queryset=None, threshold=None):
+        """
+        Return the objects of ``queryset`` whose field is similar to
+        ``query``, most similar first, annotated with ``similarity``.
+        """
+        if queryset is None:
+            queryset = self.model.objects.all()
+        if threshold is None:
+            threshold = get_similarity_threshold()
+        if self.uses_pg_trgm():
+            return self._search_pg_trgm(query, queryset, threshold)
+
+        grams = trigrams(query)
+        if not grams:
+            return queryset.none()
+        count = len(grams)
+        # similarity <= shared / count, so rows sharing fewer trigrams can't qualify
+        matches = (
+            self.table.objects.filter(trigram__in=grams)
+            .values(self.object_field)
+            .annotate(shared=Count('pk'), total=Max('total'))
+            .filter(shared__gte=math.ceil(threshold * count))
+            .annotate(similarity=Cast('shared', FloatField()) / (count + F('total') - F('shared')))
+            .filter(similarity__gte=threshold)
+            .order_by('-similarity', f'-{self.object_field}')
+            .values_list(self.object_field, 'similarity')[:get_candidate_limit()]
+        )
+        similarities = dict(matches)
+        if not similarities:
+            return queryset.none()
+        return queryset.filter(pk__in=similarities).annotate(
+            similarity=Case(
+                *[When(pk=pk, then=Value(similarity)) for pk, similarity in similarities.items()],
+                output_field=FloatField(),
+            )
+        ).order_by('-similarity', '-pk')
+
+    def _search_pg_trgm(self, query, queryset, threshold):
+        connection = connections[queryset.db]
+        column = '{}.{}'.format(
+            connection.ops.quote_name(self.model._meta.db_table),
+            connection.ops.quote_name(self.model._meta.get_field(self.field).column),
+        )
+        results = queryset.annotate(similarity=TrigramSimilarity(self.field, query)).filter(similarity__gte=threshold)
+        if threshold >= PG_TRGM_DEFAULT_THRESHOLD:
+            # ``%`` compares against pg_trgm's default threshold and can use the
+            # GIN index; below that default it would drop rows that qualify
+            results = results.filter(RawSQL(f'{column} %% %s', [query], output_field=BooleanField()))
+        return results.order_by('-similarity', '-pk')
@@ -0,0 +1,33 @@
+"""
+Single-statement, race-free inserts.
+
+``get_or_create`` first SELECTs and then INSERTs, so two concurrent requests
+can both miss the row, and the loser gets an ``IntegrityError`` from the
+unique constraint. ``insert_if_absent`` sends one
+``INSERT ... ON CONFLICT DO NOTHING`` (``INSERT IGNORE`` on MySQL) and tells
+the caller whether its row was the one that got written.
+"""
+from django.db import connections, router
+
+
+def insert_if_absent(model, **values):
+    """
+    Insert a ``model`` row built from ``values`` unless it would violate a
+    unique constraint. Return ``True`` if the row was inserted.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    obj = model(**values)
+    fields = [field for field in model._meta.local_concrete_fields if field is not model._meta.auto_field]
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    params = [field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields]
+    placeholders = ', '.join(['%s'] * len(fields))
+    table = connection.ops.quote_name(model._meta.db_table)
+
+    if connection.vendor == 'mysql':
+        sql = f'INSERT IGNORE INTO {table} ({columns}) VALUES ({placeholders})'
+    else:
+        sql = f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) ON CONFLICT DO NOTHING'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
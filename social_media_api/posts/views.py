@@ -1,11 +1,18 @@
-from rest_framework import viewsets, permissions, filters, status, generics
+from rest_framework import viewsets, permissions, status, generics
 from .models import Post, Comment, Like
 from .serializers import PostSerializer, CommentSerializer
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
-from notifications.models import Notification
+from django.db import transaction
+from notifications.dispatch import notify
+from .timeline import fan_out_post, read_feed
+from .pagination import KeysetPagination
+from .counters import annotate_like_stats, change_like_count
+from .search import FullTextSearchFilter
+from .upserts import insert_if_absent
+from . import like_buffer
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -17,43 +24,69 @@ class PostViewSet(viewsets.ModelViewSet):
     queryset = Post.objects.all().order_by('-created_at')
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['title', 'content']
+    # Set by FullTextSearchFilter to the fuzzy title search for the current query
+    search_fallback = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('author')
+        return annotate_like_stats(queryset, self.request.user)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and not page and self.search_fallback is not None:
+            # Nothing ranked, so the search was probably misspelled
+            page = super().paginate_queryset(self.search_fallback())
+        return page
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        # A failed fan-out rolls the post back instead of leaving it half delivered
+        with transaction.atomic():
+            post = serializer.save(author=self.request.user)
+            # Push the new post into the materialized timelines of the author's followers
+            fan_out_post(post)
 
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         post = generics.get_object_or_404(Post, pk=pk)
-        # Use get_or_create to prevent duplicate likes
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
+        if like_buffer.is_enabled():
+            # Acknowledge right away; the buffer flusher writes the like later
+            like_buffer.enqueue(like_buffer.LIKE, request.user.pk, post.pk)
+            return Response({'detail': 'Like accepted.'}, status=status.HTTP_202_ACCEPTED)
+
+        with transaction.atomic():
+            # One INSERT ... ON CONFLICT DO NOTHING, so concurrent likes can't collide
+            created = insert_if_absent(Like, user=request.user, post=post)
+            if created:
+                change_like_count(post, 1)
         
         if not created:
             return Response({'detail': 'You have already liked this post.'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        # Create notification
+        # Queue notification
         if post.author != request.user:  # Don't notify if user likes their own post
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb='liked',
-                target=post
-            )
+            notify(post.author, request.user, 'liked', post)
         
         return Response({'detail': 'Post liked successfully.'})
 
     @action(detail=True, methods=['post'])
     def unlike(self, request, pk=None):
         post = generics.get_object_or_404(Post, pk=pk)
-        like = Like.objects.filter(user=request.user, post=post).first()
+        if like_buffer.is_enabled():
+            like_buffer.enqueue(like_buffer.UNLIKE, request.user.pk, post.pk)
+            return Response({'detail': 'Unlike accepted.'}, status=status.HTTP_202_ACCEPTED)
+
+        with transaction.atomic():
+            deleted, _ = Like.objects.filter(user=request.user, post=post).delete()
+            if deleted:
+                change_like_count(post, -1)
         
-        if not like:
+        if not deleted:
             return Response({'detail': 'You have not liked this post.'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        like.delete()
         return Response({'detail': 'Post unliked successfully.'})
 
 class CommentViewSet(viewsets.ModelViewSet):
@@ -63,21 +96,25 @@ class CommentViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         comment = serializer.save(author=self.request.user)
-        # Create notification for post author when someone comments
+        # Queue notification for post author when someone comments
         if comment.post.author != self.request.user:
-            Notification.objects.create(
-                recipient=comment.post.author,
-                actor=self.request.user,
-                verb='commented on',
-                target=comment.post
-            )
+            notify(comment.post.author, self.request.user, 'commented on', comment.post)
 
 class FeedViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def list(self, request):
-        user = request.user
-        following_users = user.following.all()
-        posts = Post.objects.filter(author__in=following_users).order_by('-created_at')
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        paginator = self.pagination_class()
+        # Read the precomputed timeline (merged with pulled high-follower authors)
+        # instead of joining over the follow graph, one row past the page so the
+        # paginator knows whether there is more
+        posts = read_feed(
+            request.user,
+            before=paginator.decode_cursor(request),
+            limit=paginator.get_page_size(request) + 1,
+            queryset=annotate_like_stats(Post.objects.select_related('author'), request.user),
+        )
+        page = paginator.paginate_rows(posts, request)
+        serializer = PostSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
@@ -91,3 +91,6 @@ MIDDLEWARE = [
 
 # Static files compression and caching
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Write notifications off the request path through the durable queue
+NOTIFICATIONS_BACKEND = 'database'
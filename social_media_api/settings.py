@@ -139,7 +139,89 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
+
+# Feed settings
+# Number of posts kept in each user's materialized home timeline
+FEED_TIMELINE_DEPTH = 800
+# Follower timelines written per bulk insert when a post is fanned out
+FEED_FANOUT_BATCH_SIZE = 1000
+# Authors with at least this many followers are pulled at read time instead of pushed
+FEED_FANOUT_FOLLOWER_THRESHOLD = 10000
+# Seconds each process caches the set of authors pulled at read time
+FEED_PULL_AUTHORS_CACHE_TIMEOUT = 300
+
+# Like counter settings
+# Posts liked more than LIKE_SHARDING_RATE_THRESHOLD times within
+# LIKE_SHARDING_RATE_WINDOW seconds switch to LIKE_COUNTER_SHARDS counter slots
+LIKE_COUNTER_SHARDS = 16
+LIKE_SHARDING_RATE_THRESHOLD = 100
+LIKE_SHARDING_RATE_WINDOW = 60
+# Seconds a summed sharded counter is cached for
+LIKE_SHARD_CACHE_TIMEOUT = 5
+# Buffer likes and write them in bulk ('memory' flushes in-process every
+# LIKES_FLUSH_INTERVAL seconds, 'database' queues them in the PendingLike table
+# for `manage.py flush_like_buffer --loop`)
+LIKES_WRITE_BEHIND = False
+LIKES_BUFFER_BACKEND = 'memory'
+LIKES_FLUSH_INTERVAL = 1.0
+LIKES_FLUSH_BATCH_SIZE = 1000
+
+# Notification settings
+# 'sync' writes notifications inline, 'memory' queues them in-process for a
+# background thread and 'database' queues them for `manage.py process_notifications`
+NOTIFICATIONS_BACKEND = 'sync'
+NOTIFICATIONS_BATCH_SIZE = 500
+# Fold same-recipient/verb/target notifications created within this many
+# seconds into one unread row (None disables coalescing)
+NOTIFICATIONS_COALESCE_WINDOW = 3600
+NOTIFICATIONS_COALESCE_SAMPLE_SIZE = 3
+# Retention: read notifications older than NOTIFICATIONS_RETENTION_READ_DAYS
+# (and unread ones older than NOTIFICATIONS_RETENTION_UNREAD_DAYS, if set) are
+# moved to the archive table by `manage.py prune_notifications`
+NOTIFICATIONS_RETENTION_READ_DAYS = 30
+NOTIFICATIONS_RETENTION_UNREAD_DAYS = None
+NOTIFICATIONS_RETENTION_ARCHIVE = True
+# Seconds an idle notification stream waits before polling for notifications
+# written by other processes (and sending a keep-alive)
+NOTIFICATIONS_STREAM_POLL_INTERVAL = 15
+# Seconds of already-sent rows each stream poll re-scans for late commits; keep
+# it above the longest notification-writing transaction plus clock skew
+NOTIFICATIONS_STREAM_OVERLAP = 5
+# Seconds a ticket from POST /api/notifications/stream/ticket/ can open a stream
+NOTIFICATIONS_STREAM_TICKET_MAX_AGE = 30
+
+# Token authentication cache
+# Token -> user lookups kept in each process's LRU, and for how many seconds;
+# other processes notice a deleted token or deactivated user within the TTL
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 30
+# Cache alias shared by all processes, consulted on an LRU miss (None disables)
+TOKEN_AUTH_SHARED_CACHE = None
+
+# Follow graph
+# Seconds before a process reloads its in-memory follow graph in the background;
+# follows made by other processes show up after at most this long
+FOLLOW_GRAPH_MAX_AGE = 300
+# Edges changed since the last load that are folded back into the arrays at once
+FOLLOW_GRAPH_COMPACT_THRESHOLD = 10000
+
+# Follow suggestions, recomputed by running `manage.py generate_follow_suggestions` periodically
+# Candidates stored per user
+FOLLOW_SUGGESTIONS_LIMIT = 20
+# Users scored per process-pool task
+FOLLOW_SUGGESTIONS_SHARD_SIZE = 1000
+
+# Fuzzy search: minimum trigram similarity (0-1) for a misspelled post title or
+# username to match, and how many candidates the local trigram table returns
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3
+TRIGRAM_CANDIDATE_LIMIT = 100
+
+# Username autocomplete
+# Suggestions returned per keystroke, and seconds before a process reloads its
+# in-memory username index in the background (renames elsewhere show up after this long)
+USERNAME_AUTOCOMPLETE_LIMIT = 10
+USERNAME_AUTOCOMPLETE_MAX_AGE = 300